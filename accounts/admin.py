@@ -1,4 +1,16 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from core.admin import ApproximateCountPaginator
 
-# Register your models here.
+admin.site.unregister(User)
 
+
+@admin.register(User)
+class AccountAdmin(UserAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # Username is unique and email is indexed (accounts migration 0001).
+    search_fields = ['=username', '=email']
+    ordering = ['-id']
@@ -0,0 +1,46 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create user accounts in bulk from a CSV file with the columns "
+        "username, email, password and optionally first_name, last_name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path of the CSV file to import.')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Password hashing processes (default: PROVISIONING_PROCESSES).')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows per bulk insert (default: PROVISIONING_CHUNK_SIZE).')
+        parser.add_argument('--tokens-out', default=None,
+                            help='Write username, email and auth token of the created users to this CSV file.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['csv_file']}: {e}")
+
+        started = time.perf_counter()
+        result = provision_users(rows, processes=options['processes'], chunk_size=options['chunk_size'])
+        if result.errors:
+            for error in result.errors:
+                # Line 1 of the file is the header.
+                self.stderr.write(f"Line {error['index'] + 2}: {error['errors']}")
+            raise CommandError(f"{len(result.errors)} invalid row(s); no users were created.")
+
+        if options['tokens_out']:
+            with open(options['tokens_out'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['username', 'email', 'token'])
+                for user in result.users:
+                    writer.writerow([user.username, user.email, result.tokens[user.pk]])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result.users)} user(s) in {time.perf_counter() - started:.1f}s."
+        ))
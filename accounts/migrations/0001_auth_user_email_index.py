@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index ``auth_user.email``. The built-in User model does not index it, but
+    registration and bulk provisioning look users up by email.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX accounts_auth_user_email_idx ON auth_user (email);',
+            reverse_sql='DROP INDEX accounts_auth_user_email_idx;',
+        ),
+    ]
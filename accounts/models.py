@@ -1,3 +1,33 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ProvisioningBatch(models.Model):
+    """
+    A bulk provisioning request made over the API, carried out by the
+    'accounts.provision' job. ``rows`` (which hold the plain-text passwords)
+    are cleared as soon as the batch has been processed, or once its job has
+    failed for good.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows = models.JSONField(default=list)
+    # ``{'created': [...]}`` when done, ``{'errors': [...]}`` when failed.
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Provisioning batch {self.pk} ({self.status})"
@@ -0,0 +1,125 @@
+"""
+Bulk creation of user accounts, used by the ``provision_users`` command and
+the 'accounts.provision' job behind the admin ``/api/accounts/bulk-provision/``
+endpoint.
+
+Registering accounts one at a time costs a uniqueness lookup, a PBKDF2 hash
+and an insert per user. Here rows are validated first, uniqueness is checked
+with a few ``IN`` queries for the whole batch, passwords are hashed across a
+process pool, and users and their tokens are inserted with ``bulk_create``.
+Provisioning is all-or-nothing: if any row is invalid, nothing is created.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from core.processes import setup_worker
+
+# Below this many passwords, starting worker processes costs more than it saves.
+MIN_PARALLEL_PASSWORDS = 8
+
+
+class ProvisionedUserSerializer(serializers.Serializer):
+    """Validates one row; uniqueness is checked for the whole batch afterwards."""
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField()
+    password = serializers.CharField(min_length=8, write_only=True)
+    first_name = serializers.CharField(max_length=150, required=False, default='', allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, default='', allow_blank=True)
+
+
+@dataclass
+class ProvisioningResult:
+    users: list = field(default_factory=list)
+    tokens: dict = field(default_factory=dict)
+    errors: list = field(default_factory=list)
+
+
+def hash_passwords(passwords, processes=None):
+    """Hash ``passwords`` with the configured hasher, in parallel when worthwhile."""
+    processes = processes or settings.PROVISIONING_PROCESSES or os.cpu_count() or 1
+    if processes == 1 or len(passwords) < MIN_PARALLEL_PASSWORDS:
+        return [make_password(password) for password in passwords]
+    if multiprocessing.current_process().daemon:
+        # Job worker processes may not start children; PBKDF2 releases the
+        # GIL while it runs, so threads hash in parallel too.
+        with ThreadPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(make_password, passwords))
+    with ProcessPoolExecutor(max_workers=processes, initializer=setup_worker) as pool:
+        chunksize = max(1, len(passwords) // (processes * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _existing(field_name, values, chunk_size):
+    """Return which of ``values`` are already taken, a chunk of ``IN`` lookups at a time."""
+    values = list(values)
+    taken = set()
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        taken.update(User.objects.filter(**{f'{field_name}__in': chunk}).values_list(field_name, flat=True))
+    return taken
+
+
+def validate_rows(rows, chunk_size):
+    """Return ``(valid_data, errors)``; ``errors`` lists ``{'index', 'errors'}`` per bad row."""
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = ProvisionedUserSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    taken_usernames = _existing('username', {data['username'] for _, data in valid}, chunk_size)
+    taken_emails = _existing('email', {data['email'] for _, data in valid}, chunk_size)
+    seen_usernames, seen_emails = set(), set()
+    for index, data in valid:
+        row_errors = {}
+        if data['username'] in taken_usernames or data['username'] in seen_usernames:
+            row_errors['username'] = ["A user with that username already exists."]
+        if data['email'] in taken_emails or data['email'] in seen_emails:
+            row_errors['email'] = ["This field must be unique."]
+        seen_usernames.add(data['username'])
+        seen_emails.add(data['email'])
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+    errors.sort(key=lambda error: error['index'])
+    return [data for _, data in valid], errors
+
+
+def provision_users(rows, processes=None, chunk_size=None):
+    """
+    Create users (and auth tokens) for ``rows`` of ``username``, ``email``,
+    ``password`` and optional ``first_name``/``last_name``.
+    """
+    chunk_size = chunk_size or settings.PROVISIONING_CHUNK_SIZE
+    valid, errors = validate_rows(rows, chunk_size)
+    if errors:
+        return ProvisioningResult(errors=errors)
+
+    hashes = hash_passwords([data['password'] for data in valid], processes)
+    users = [
+        User(
+            username=data['username'], email=data['email'], password=password_hash,
+            first_name=data['first_name'], last_name=data['last_name'],
+        )
+        for data, password_hash in zip(valid, hashes)
+    ]
+    with transaction.atomic():
+        users = User.objects.bulk_create(users, batch_size=chunk_size)
+        if users and users[0].pk is None:
+            # Backends that cannot return ids from a bulk insert.
+            by_username = User.objects.in_bulk([user.username for user in users], field_name='username')
+            users = [by_username[user.username] for user in users]
+        tokens = Token.objects.bulk_create(
+            [Token(user=user, key=Token.generate_key()) for user in users], batch_size=chunk_size,
+        )
+    return ProvisioningResult(users=users, tokens={token.user_id: token.key for token in tokens})
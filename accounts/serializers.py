@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
+from .models import ProvisioningBatch
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
@@ -28,4 +29,23 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         )
         user.set_password(validated_data['password'])
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+class ProvisioningBatchSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name='provisioning-batch')
+    size = serializers.SerializerMethodField()
+    created = serializers.SerializerMethodField()
+    errors = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProvisioningBatch
+        fields = ['id', 'url', 'status', 'size', 'created', 'errors', 'created_at', 'finished_at']
+
+    def get_size(self, obj):
+        return len(obj.rows) if obj.status == ProvisioningBatch.PENDING else len(obj.result.get('created', []))
+
+    def get_created(self, obj):
+        return obj.result.get('created')
+
+    def get_errors(self, obj):
+        return obj.result.get('errors')
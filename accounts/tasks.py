@@ -0,0 +1,36 @@
+from django.utils import timezone
+from core.jobs import job
+from .models import ProvisioningBatch
+from .provisioning import provision_users
+
+
+def provision_failed(payloads):
+    """Give up on batches whose job failed for good, and drop their plain-text passwords."""
+    ProvisioningBatch.objects.filter(
+        pk__in=[payload['batch_id'] for payload in payloads], status=ProvisioningBatch.PENDING,
+    ).update(
+        status=ProvisioningBatch.FAILED, rows=[], finished_at=timezone.now(),
+        result={'errors': [{'index': None, 'errors': {'non_field_errors': ["Provisioning failed; no accounts were created."]}}]},
+    )
+
+
+@job('accounts.provision', max_attempts=3, on_failure=provision_failed)
+def provision(payloads):
+    """Create the accounts of a ``ProvisioningBatch`` accepted by the bulk-provision endpoint."""
+    for payload in payloads:
+        batch = ProvisioningBatch.objects.filter(pk=payload['batch_id'], status=ProvisioningBatch.PENDING).first()
+        if batch is None:
+            continue
+        result = provision_users(batch.rows)
+        if result.errors:
+            # Usernames or emails taken since the batch was accepted.
+            batch.status, batch.result = ProvisioningBatch.FAILED, {'errors': result.errors}
+        else:
+            batch.status = ProvisioningBatch.DONE
+            batch.result = {'created': [
+                {'user_id': user.pk, 'username': user.username, 'email': user.email, 'token': result.tokens[user.pk]}
+                for user in result.users
+            ]}
+        batch.rows = []
+        batch.finished_at = timezone.now()
+        batch.save()
@@ -1,11 +1,17 @@
 # accounts/tests.py
 
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from core.jobs import run_pending_jobs
+from core.models import Job
+from .models import ProvisioningBatch
 
 
 class UserRegistrationTestCase(APITestCase):
@@ -34,6 +40,14 @@ class UserRegistrationTestCase(APITestCase):
         self.assertEqual(user.first_name, 'Test')
         self.assertEqual(user.last_name, 'User')
     
+    def test_user_registration_retry_with_idempotency_key(self):
+        """Test that a retried registration replays the first response"""
+        first = self.client.post(self.register_url, self.valid_user_data, HTTP_IDEMPOTENCY_KEY='signup-1')
+        retry = self.client.post(self.register_url, self.valid_user_data, HTTP_IDEMPOTENCY_KEY='signup-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(User.objects.filter(username='testuser').count(), 1)
+    
     def test_user_registration_password_mismatch(self):
         """Test registration with mismatched passwords"""
         data = self.valid_user_data.copy()
@@ -326,4 +340,164 @@ class IntegrationTestCase(APITestCase):
         
         # 4. Try to logout again (should fail)
         logout_response2 = self.client.post(reverse('logout'))
-        self.assertEqual(logout_response2.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(logout_response2.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class BulkProvisioningTestCase(APITestCase):
+    """Test cases for bulk user provisioning"""
+
+    def setUp(self):
+        self.url = reverse('bulk-provision')
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='adminpass123')
+        self.client.force_authenticate(self.admin)
+
+    def rows(self, count, prefix='corp'):
+        return [
+            {'username': f'{prefix}{i}', 'email': f'{prefix}{i}@example.com', 'password': f'secret-pass-{i}'}
+            for i in range(count)
+        ]
+
+    def test_bulk_provision_creates_users_and_tokens(self):
+        """Test that every row gets a usable account and token, created in the background"""
+        response = self.client.post(self.url, {'users': self.rows(3)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response['Location'], response.data['url'])
+        self.assertFalse(User.objects.filter(username__startswith='corp').exists())
+
+        run_pending_jobs()
+        batch = self.client.get(response.data['url'])
+        self.assertEqual(batch.data['status'], 'done')
+        self.assertEqual([item['username'] for item in batch.data['created']], ['corp0', 'corp1', 'corp2'])
+        user = User.objects.get(username='corp1')
+        self.assertTrue(user.check_password('secret-pass-1'))
+        self.assertEqual(Token.objects.get(user=user).key, batch.data['created'][1]['token'])
+        # The plain-text passwords are not kept once the batch is done.
+        self.assertEqual(ProvisioningBatch.objects.get().rows, [])
+
+    def test_bulk_provision_fails_if_rows_are_taken_meanwhile(self):
+        """Test that a batch whose usernames were taken after it was accepted creates nothing"""
+        response = self.client.post(self.url, {'users': self.rows(2)}, format='json')
+        User.objects.create_user(username='corp1', email='someone@example.com')
+        run_pending_jobs()
+
+        batch = self.client.get(response.data['url'])
+        self.assertEqual(batch.data['status'], 'failed')
+        self.assertEqual(batch.data['errors'], [{'index': 1, 'errors': {'username': ["A user with that username already exists."]}}])
+        self.assertFalse(User.objects.filter(username='corp0').exists())
+
+    def test_bulk_provision_job_failing_for_good_drops_the_passwords(self):
+        """Test that a batch whose job keeps crashing ends up failed, without its rows"""
+        response = self.client.post(self.url, {'users': self.rows(2)}, format='json')
+        with mock.patch('accounts.tasks.provision_users', side_effect=RuntimeError('boom')), \
+                self.assertLogs('core.jobs', level='ERROR'):
+            for _ in range(3):
+                Job.objects.update(run_at=timezone.now())
+                run_pending_jobs()
+
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        batch = self.client.get(response.data['url'])
+        self.assertEqual(batch.data['status'], 'failed')
+        self.assertEqual(ProvisioningBatch.objects.get().rows, [])
+        self.assertFalse(User.objects.filter(username__startswith='corp').exists())
+
+    def test_bulk_provision_is_all_or_nothing(self):
+        """Test that duplicates in the batch or the database reject the whole batch"""
+        User.objects.create_user(username='taken', email='corp1@example.com')
+        rows = self.rows(3)
+        rows[2]['username'] = 'corp0'
+        rows.append({'username': 'bad', 'email': 'not-an-email', 'password': 'secret-pass'})
+
+        response = self.client.post(self.url, {'users': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [(error['index'], sorted(error['errors'])) for error in response.data['errors']],
+            [(1, ['email']), (2, ['username']), (3, ['email'])],
+        )
+        self.assertFalse(User.objects.filter(username__startswith='corp').exists())
+
+    def test_bulk_provision_requires_admin(self):
+        """Test that regular users cannot provision accounts"""
+        self.client.force_authenticate(User.objects.create_user(username='regular', password='testpass123'))
+        response = self.client.post(self.url, {'users': self.rows(1)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_passwords_are_hashed_in_parallel(self):
+        """Test that the process pool produces valid hashes in order"""
+        from django.contrib.auth.hashers import check_password
+        from .provisioning import hash_passwords
+
+        passwords = [f'password-{i}' for i in range(10)]
+        hashes = hash_passwords(passwords, processes=2)
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+    def test_passwords_are_hashed_with_threads_in_job_workers(self):
+        """Test that daemonic job worker processes, which cannot start children, hash with threads"""
+        from types import SimpleNamespace
+        from django.contrib.auth.hashers import check_password
+        from .provisioning import hash_passwords
+
+        passwords = [f'password-{i}' for i in range(10)]
+        worker = SimpleNamespace(daemon=True)
+        with mock.patch('accounts.provisioning.multiprocessing.current_process', return_value=worker), \
+                mock.patch('accounts.provisioning.ProcessPoolExecutor') as process_pool:
+            hashes = hash_passwords(passwords, processes=2)
+        process_pool.assert_not_called()
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+
+class ReviewHistoryTestCase(APITestCase):
+    def setUp(self):
+        from products.models import Product, ProductImage
+        from reviews.models import Review
+
+        self.user = User.objects.create_user(username='historian', password='testpass123')
+        self.products = [
+            Product.objects.create(name=f'Product {i}', description='A product.', price='10.00') for i in range(5)
+        ]
+        ProductImage.objects.create(product=self.products[0], image='product_images/first.gif')
+        self.reviews = [
+            Review.objects.create(product=product, user=self.user, rating=4, feedback=f'Review {i}')
+            for i, product in enumerate(self.products)
+        ]
+
+    def test_my_reviews_newest_first_with_cursor(self):
+        """Test that my review history pages newest first and follows the next cursor"""
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('my-reviews'), {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data['results']], [r.id for r in self.reviews[:1:-1]])
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['id'] for r in response.data['results']], [self.reviews[1].id, self.reviews[0].id])
+        self.assertIsNone(response.data['next'])
+        oldest = response.data['results'][-1]
+        self.assertEqual(oldest['product_name'], 'Product 0')
+        self.assertTrue(oldest['product_thumbnail'].endswith('/media/product_images/first.gif'))
+        self.assertIsNone(response.data['results'][0]['product_thumbnail'])
+
+    def test_my_reviews_requires_authentication(self):
+        """Test that anonymous users cannot list "my" reviews"""
+        response = self.client.get(reverse('my-reviews'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_public_user_reviews(self):
+        """Test the public history by username, hiding deleted products"""
+        from django.utils import timezone
+        self.products[4].deleted_at = timezone.now()
+        self.products[4].save()
+
+        response = self.client.get(reverse('user-reviews', kwargs={'username': 'historian'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 4)
+
+        response = self.client.get(reverse('user-reviews', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_review_history_query_count_is_constant(self):
+        """Test that product names and thumbnails do not cost a query per review"""
+        url = reverse('user-reviews', kwargs={'username': 'historian'})
+        # User lookup, reviews joined to products, one prefetch of images, and
+        # the archive, which this last page of hot reviews continues into.
+        with self.assertNumQueries(4):
+            self.client.get(url)
@@ -1,10 +1,15 @@
 # accounts/urls.py
 
 from django.urls import path
-from .views import UserRegistrationView, CustomAuthToken, LogoutView
+from reviews.views import MyReviewHistoryView, UserReviewHistoryView
+from .views import UserRegistrationView, BulkProvisionView, ProvisioningBatchView, CustomAuthToken, LogoutView
 
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'),
+    path('bulk-provision/', BulkProvisionView.as_view(), name='bulk-provision'),
+    path('bulk-provision/<uuid:pk>/', ProvisioningBatchView.as_view(), name='provisioning-batch'),
     path('login/', CustomAuthToken.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('me/reviews/', MyReviewHistoryView.as_view(), name='my-reviews'),
+    path('users/<str:username>/reviews/', UserReviewHistoryView.as_view(), name='user-reviews'),
 ]
\ No newline at end of file
@@ -1,20 +1,71 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from .serializers import UserRegistrationSerializer
+from rest_framework.exceptions import ValidationError
+from core.idempotency import IdempotentCreateMixin
+from core.jobs import enqueue
+from core.metrics import auth_login_attempts_total
+from core.throttling import LoginRateThrottle, LoginUsernameRateThrottle, RegistrationRateThrottle
+from .models import ProvisioningBatch
+from .provisioning import validate_rows
+from .serializers import ProvisioningBatchSerializer, UserRegistrationSerializer
 
-class UserRegistrationView(generics.CreateAPIView):
+class UserRegistrationView(IdempotentCreateMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistrationRateThrottle]
+
+class BulkProvisionView(APIView):
+    """
+    Admin-only endpoint to create many accounts at once from
+    ``{"users": [{"username", "email", "password", ...}, ...]}``.
+
+    Rows are validated straight away; nothing is created unless every row is
+    valid. Hashing the passwords takes a while, so the accounts are then
+    created by a background job and the response points at the batch's status.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        rows = request.data.get('users')
+        if not isinstance(rows, list) or not rows:
+            raise ValidationError({'users': "Provide a non-empty list of users."})
+        if len(rows) > settings.PROVISIONING_MAX_USERS:
+            raise ValidationError({'users': f"At most {settings.PROVISIONING_MAX_USERS} users may be provisioned at once."})
+
+        _, errors = validate_rows(rows, settings.PROVISIONING_CHUNK_SIZE)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            batch = ProvisioningBatch.objects.create(requested_by=request.user, rows=rows)
+            enqueue('accounts.provision', {'batch_id': str(batch.pk)})
+        data = ProvisioningBatchSerializer(batch, context={'request': request}).data
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+class ProvisioningBatchView(generics.RetrieveAPIView):
+    """Status of a bulk provisioning batch, with the created accounts and their tokens once done."""
+    queryset = ProvisioningBatch.objects.all()
+    serializer_class = ProvisioningBatchSerializer
+    permission_classes = [permissions.IsAdminUser]
 
 class CustomAuthToken(ObtainAuthToken):
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
+
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            auth_login_attempts_total.inc(result='failure')
+            raise
+        auth_login_attempts_total.inc(result='success')
 
         user = serializer.validated_data['user']
         token, created = Token.objects.get_or_create(user=user)
@@ -0,0 +1,51 @@
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator for tables too large to ``COUNT(*)`` on every page view.
+
+    An unfiltered changelist uses the planner's row estimate on PostgreSQL, or
+    the highest primary key elsewhere (an index lookup). Filtered counts stop
+    at ``limit`` rows, so later pages of a huge result are reached by
+    narrowing the filter instead.
+    """
+    limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimate(queryset)
+            if estimate is not None and estimate > self.limit:
+                return estimate
+        return queryset.order_by()[:self.limit].count()
+
+    def estimate(self, queryset):
+        model = queryset.model
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+                row = cursor.fetchone()
+            return row[0] if row and row[0] > 0 else None
+        if model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+            return model._default_manager.using(queryset.db).aggregate(max_pk=Max('pk'))['max_pk']
+        return None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base changelist settings for tables with millions of rows: no exact full
+    count, no facet counts, and an approximate paginator. Subclasses should
+    keep ``search_fields`` on indexed columns and use ``raw_id_fields`` and
+    ``list_select_related`` for foreign keys.
+    """
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_per_page = 50
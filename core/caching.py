@@ -0,0 +1,252 @@
+"""
+Versioned response cache with precompressed variants.
+
+Read views that mix in ``CachedResponseMixin`` store their rendered JSON in the
+``RESPONSE_CACHE`` cache together with gzip (and, when the ``brotli`` package is
+installed, brotli) encodings of it. Compression therefore happens once per
+content version, and each request just picks the variant its
+``Accept-Encoding`` allows.
+
+Entries are tagged with the current version of every *scope* the view depends
+on (for example ``products`` or ``product:42``). Writes call
+``bump_versions()`` for the scopes they touch, which makes every entry built
+from the old data miss without having to find and delete it.
+
+Entries outdated by a write, or older than ``RESPONSE_CACHE_TIMEOUT``, are
+stale rather than gone: they are kept for another ``RESPONSE_CACHE_STALE_TTL``
+seconds. Only one request per key rebuilds a stale or missing entry (a
+single-flight lock held within the process and, through the cache, across
+processes); concurrent requests are answered with the stale copy meanwhile,
+or, when there is none yet, wait for the rebuild to finish instead of
+repeating it.
+"""
+import gzip
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .metrics import cache_requests_total
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_LENGTH = 200
+# How often a request waiting on another process's rebuild checks the cache.
+REFRESH_POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE]
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(scopes):
+    """Return the current version token of each scope, creating missing ones."""
+    cache = _cache()
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return tuple(versions)
+
+
+def bump_versions(*scopes):
+    """
+    Invalidate every cached response that depends on ``scopes``.
+
+    Versions are bumped straight away and again once the surrounding
+    transaction commits, so a response rebuilt from pre-commit data in between
+    cannot outlive the write.
+    """
+    def bump():
+        _cache().set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+    bump()
+    transaction.on_commit(bump)
+
+
+# Keys being rebuilt by a request in this process, each with an event that is
+# set when the rebuild finishes.
+_refreshing = {}
+_refreshing_lock = threading.Lock()
+
+
+def _lock_key(key):
+    return f'lock:{key}'
+
+
+def acquire_refresh(key):
+    """
+    Claim the rebuild of ``key``. Returns a token for ``release_refresh()``, or
+    ``None`` when another request in this or another process already has it.
+    """
+    with _refreshing_lock:
+        if key in _refreshing:
+            return None
+        _refreshing[key] = threading.Event()
+    token = uuid.uuid4().hex
+    if _cache().add(_lock_key(key), token, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        return token
+    _end_refresh(key)
+    return None
+
+
+def release_refresh(key, token):
+    cache = _cache()
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+    _end_refresh(key)
+
+
+def _end_refresh(key):
+    with _refreshing_lock:
+        done = _refreshing.pop(key, None)
+    if done is not None:
+        done.set()
+
+
+def wait_for_refresh(key):
+    """Wait, at most ``RESPONSE_CACHE_LOCK_TIMEOUT`` seconds, for a rebuild of ``key`` to finish."""
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    with _refreshing_lock:
+        done = _refreshing.get(key)
+    if done is not None:
+        done.wait(settings.RESPONSE_CACHE_LOCK_TIMEOUT)
+    cache = _cache()
+    while cache.get(_lock_key(key)) is not None and time.monotonic() < deadline:
+        time.sleep(REFRESH_POLL_INTERVAL)
+
+
+def compress_variants(content):
+    variants = {'identity': content}
+    if len(content) >= MIN_COMPRESS_LENGTH:
+        compressed = gzip.compress(content, mtime=0)
+        if len(compressed) < len(content):
+            variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(content)
+            if len(compressed) < len(content):
+                variants['br'] = compressed
+    return variants
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def choose_variant(variants, accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+
+class CachedResponseMixin:
+    """
+    Serve ``GET`` from the response cache.
+
+    Views set ``cache_scopes`` to a list of scope names, formatted with the
+    view's URL kwargs (e.g. ``'product:{pk}'``). Only successful plain JSON
+    responses are cached; the browsable API is always rendered live.
+    """
+    cache_scopes = ()
+
+    def get_cache_scopes(self):
+        return [scope.format(**self.kwargs) for scope in self.cache_scopes]
+
+    def get_cache_key(self, request):
+        raw = f'{request.get_full_path()}|{request.accepted_media_type}'
+        return 'response:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        self._cache_entry = None
+        self._cache_store = None
+        if not settings.RESPONSE_CACHE_ENABLED or request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        versions = get_versions(self.get_cache_scopes())
+        entry = _cache().get(key)
+        view_name = type(self).__name__
+        if entry is not None and entry['versions'] == versions and time.time() < entry.get('fresh_until', 0):
+            cache_requests_total.inc(view=view_name, result='hit')
+            return self.serve_entry(entry)
+
+        token = acquire_refresh(key)
+        if token is None:
+            if entry is None:
+                # Nothing to fall back on yet: let the other request finish.
+                wait_for_refresh(key)
+                entry = _cache().get(key)
+            if entry is not None:
+                cache_requests_total.inc(view=view_name, result='stale')
+                return self.serve_entry(entry)
+
+        cache_requests_total.inc(view=view_name, result='miss')
+        self._cache_store = (key, versions, token)
+        return super().get(request, *args, **kwargs)
+
+    def serve_entry(self, entry):
+        self._cache_entry = entry
+        return self.response_from_entry(entry)
+
+    def response_from_entry(self, entry):
+        return HttpResponse(entry['variants']['identity'], content_type=entry['content_type'])
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        entry = getattr(self, '_cache_entry', None)
+        store = getattr(self, '_cache_store', None)
+        if entry is None and store is not None and response.status_code == 200:
+            if hasattr(response, 'render'):
+                response.render()
+            key, versions, _ = store
+            entry = {
+                'versions': versions,
+                'fresh_until': time.time() + settings.RESPONSE_CACHE_TIMEOUT,
+                'content_type': response['Content-Type'],
+                'variants': compress_variants(response.content),
+            }
+            _cache().set(key, entry, settings.RESPONSE_CACHE_TIMEOUT + settings.RESPONSE_CACHE_STALE_TTL)
+        if entry is not None:
+            encoding = choose_variant(entry['variants'], request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if encoding != 'identity':
+                response.content = entry['variants'][encoding]
+                response['Content-Encoding'] = encoding
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            store = getattr(self, '_cache_store', None)
+            if store is not None and store[2] is not None:
+                release_refresh(store[0], store[2])
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_response_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(settings.RESPONSE_CACHE, {}).get('BACKEND')
+    if not settings.RESPONSE_CACHE_ENABLED or backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f"RESPONSE_CACHE '{settings.RESPONSE_CACHE}' is not shared between processes.",
+        hint=(
+            "Writes made by job workers or other web workers will not invalidate the "
+            "responses cached here. Use a file, database, Redis or Memcached cache."
+        ),
+        id='core.W001',
+    )]
+
+
+@register()
+def check_throttle_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(settings.THROTTLE_CACHE, {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f"THROTTLE_CACHE '{settings.THROTTLE_CACHE}' is not shared between processes.",
+        hint=(
+            "Every worker process keeps its own buckets, so each rate limit is multiplied "
+            "by the number of workers. Use a file, Redis or Memcached cache."
+        ),
+        id='core.W002',
+    )]
+
+
+@register()
+def check_events_backend(app_configs, **kwargs):
+    if settings.EVENTS_BACKEND != 'core.events.LocalBackend':
+        return []
+    return [Warning(
+        "EVENTS_BACKEND 'core.events.LocalBackend' only reaches subscribers in the same process.",
+        hint=(
+            "Events published by job workers (such as rating updates) and by other web "
+            "workers never reach streaming clients. Use 'core.events.DatabaseBackend'."
+        ),
+        id='core.W003',
+    )]
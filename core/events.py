@@ -0,0 +1,190 @@
+"""
+Publish/subscribe broker for server-sent events.
+
+Code that changes data calls ``publish(topic, event, data)``; async views
+consume ``subscribe(topic, ...)``. Events carry an increasing id so that a
+reconnecting client can send ``Last-Event-ID`` and receive what it missed.
+
+The backend is chosen by ``EVENTS_BACKEND``:
+
+* ``DatabaseBackend`` (the default) stores events in the ``core.Event`` table.
+  One poller task per process reads new rows and fans them out to that
+  process's subscribers, so every web worker sees every event, including those
+  published by job workers, and resume survives reconnecting to a different
+  worker.
+* ``LocalBackend`` fans events out to subscribers in the same process and keeps
+  the last ``EVENTS_REPLAY_SIZE`` events of each topic for resuming. Events
+  published by other processes (e.g. job workers) are not seen, and ids start
+  again from 1 when the process restarts.
+
+A ``Last-Event-ID`` above the newest id the backend knows of comes from before
+a restart (or from another process); it is ignored rather than holding back
+every new event until the ids catch up.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class LocalBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._history = defaultdict(lambda: deque(maxlen=settings.EVENTS_REPLAY_SIZE))
+        self._subscribers = defaultdict(set)
+
+    def publish(self, topic, event, data):
+        with self._lock:
+            self._last_id += 1
+            item = (self._last_id, event, data)
+            self._history[topic].append(item)
+        self._dispatch(topic, [item])
+        return item[0]
+
+    def _dispatch(self, topic, items):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for loop, queue in subscribers:
+            for item in items:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+                except RuntimeError:
+                    # The subscriber's event loop has already shut down.
+                    pass
+
+    async def _get_backlog(self, topic, last_event_id):
+        with self._lock:
+            return [item for item in self._history.get(topic, ()) if item[0] > last_event_id]
+
+    async def _latest_id(self):
+        with self._lock:
+            return self._last_id
+
+    async def _on_subscribe(self):
+        pass
+
+    async def subscribe(self, topic, last_event_id=None, heartbeat=None):
+        """
+        Yield ``(id, event, data)`` tuples for ``topic`` as they are published,
+        starting after ``last_event_id`` when given. Yields ``None`` whenever
+        ``heartbeat`` seconds pass without an event.
+        """
+        queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[topic].add(subscriber)
+        try:
+            await self._on_subscribe()
+            if last_event_id is not None and last_event_id > await self._latest_id():
+                last_event_id = None
+            last_sent = last_event_id or 0
+            if last_event_id is not None:
+                for item in await self._get_backlog(topic, last_event_id):
+                    last_sent = item[0]
+                    yield item
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                # Skip anything already delivered from the backlog.
+                if item[0] > last_sent:
+                    last_sent = item[0]
+                    yield item
+        finally:
+            with self._lock:
+                self._subscribers[topic].discard(subscriber)
+                if not self._subscribers[topic]:
+                    del self._subscribers[topic]
+
+
+class DatabaseBackend(LocalBackend):
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+        self._cursor = 0
+
+    def publish(self, topic, event, data):
+        from .models import Event
+        row = Event.objects.create(topic=topic, event=event, data=data)
+        cutoff = timezone.now() - timedelta(seconds=settings.EVENTS_RETENTION)
+        Event.objects.filter(created_at__lt=cutoff).delete()
+        return row.pk
+
+    async def _get_backlog(self, topic, last_event_id):
+        from .models import Event
+        rows = Event.objects.filter(topic=topic, pk__gt=last_event_id).order_by('pk')
+        return [(row.pk, row.event, row.data) async for row in rows]
+
+    async def _on_subscribe(self):
+        if self._poller is None or self._poller.done():
+            # Fix the poller's starting point before the subscriber reads its
+            # backlog, so the two overlap (and are de-duplicated) instead of
+            # leaving a gap.
+            cursor = await self._latest_id()
+            if self._poller is None or self._poller.done():
+                self._cursor = cursor
+                self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    @sync_to_async
+    def _latest_id(self):
+        from .models import Event
+        return Event.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    @sync_to_async
+    def _fetch(self):
+        from .models import Event
+        rows = list(Event.objects.filter(pk__gt=self._cursor).order_by('pk').values_list('pk', 'topic', 'event', 'data'))
+        if rows:
+            self._cursor = rows[-1][0]
+        return rows
+
+    async def _poll(self):
+        while self._subscribers:
+            by_topic = defaultdict(list)
+            for pk, topic, event, data in await self._fetch():
+                by_topic[topic].append((pk, event, data))
+            for topic, items in by_topic.items():
+                self._dispatch(topic, items)
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.EVENTS_BACKEND)()
+        return _backend
+
+
+def publish(topic, event, data):
+    """Publish an event once the current transaction (if any) has committed."""
+    transaction.on_commit(lambda: get_backend().publish(topic, event, data))
+
+
+def subscribe(topic, last_event_id=None, heartbeat=None):
+    return get_backend().subscribe(topic, last_event_id, heartbeat)
+
+
+async def sse_stream(topic, last_event_id=None):
+    """Format the events of ``topic`` as a ``text/event-stream`` body."""
+    yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+    async for item in subscribe(topic, last_event_id, heartbeat=settings.EVENTS_HEARTBEAT):
+        if item is None:
+            yield ': keep-alive\n\n'
+            continue
+        event_id, event, data = item
+        yield f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
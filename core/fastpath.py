@@ -0,0 +1,78 @@
+"""
+Fast-path rendering for read-only list endpoints.
+
+Views that mix in ``FastListMixin`` build their list rows straight from
+``.values_list()`` tuples and encode them with ``dumps()``, skipping DRF's
+field-by-field serialization. The bytes are identical to what the view's
+serializer and ``JSONRenderer`` would produce; the fast path is only taken when
+the client negotiated plain JSON and the view is not paginated.
+
+``orjson`` is used for encoding when it is installed.
+"""
+import json
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.encoding import filepath_to_uri
+from .profiling import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_URL_SENTINEL = 918273645
+
+
+def dumps(data):
+    """Encode ``data`` exactly like DRF's compact, strict ``JSONRenderer``."""
+    if orjson is not None:
+        ret = orjson.dumps(data).decode()
+    else:
+        ret = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def detail_url_builder(request, view_name, **kwargs):
+    """
+    Return ``build(pk)`` producing the same absolute URL as a
+    ``HyperlinkedIdentityField`` without calling ``reverse()`` per row.
+    """
+    url = request.build_absolute_uri(reverse(view_name, kwargs={'pk': _URL_SENTINEL, **kwargs}))
+    prefix, suffix = url.split(str(_URL_SENTINEL))
+    return lambda pk: f'{prefix}{pk}{suffix}'
+
+
+def media_url_builder(request, storage):
+    """Return ``build(name)`` producing the URL a DRF ``ImageField`` would render."""
+    if isinstance(storage, FileSystemStorage):
+        prefix = request.build_absolute_uri(storage.base_url)
+        return lambda name: prefix + filepath_to_uri(name).lstrip('/') if name else None
+    return lambda name: request.build_absolute_uri(storage.url(name)) if name else None
+
+
+class FastListMixin:
+    """
+    Serve ``list()`` from ``fast_list_rows(queryset)`` when possible.
+
+    Subclasses implement ``fast_list_rows`` returning a list of plain dicts in
+    the same shape as their list serializer. Values that need non-trivial
+    formatting (decimals, datetimes) should go through the serializer's own
+    field instances so the output cannot drift from the slow path.
+    """
+
+    def use_fast_list(self, request):
+        if not settings.FAST_LIST_RENDERING or self.paginator is not None:
+            return False
+        renderer = request.accepted_renderer
+        return renderer.format == 'json' and renderer.get_indent(request.accepted_media_type, {}) is None
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        with timed('serialize'):
+            content = dumps(self.fast_list_rows(queryset))
+        return HttpResponse(content, content_type=request.accepted_renderer.media_type)
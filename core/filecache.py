@@ -0,0 +1,36 @@
+"""
+Django's file-based cache with an ``add()`` that is atomic across processes.
+
+The stock backend checks for the key and then writes it, so two processes can
+both "add" the same key. Here the entry is written to a temporary file and
+hard-linked into place, which fails if the file already exists. That makes
+``add()`` usable as a lock, as the throttles and the response cache's
+single-flight rebuilds do.
+"""
+import os
+import tempfile
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache as BaseFileBasedCache
+
+
+class FileBasedCache(BaseFileBasedCache):
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            # An expired entry is removed by has_key(), so one more try is enough.
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    if self.has_key(key, version):
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
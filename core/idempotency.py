@@ -0,0 +1,142 @@
+"""
+``Idempotency-Key`` support for POST endpoints.
+
+A client that may retry a write sends a unique ``Idempotency-Key`` header.
+The first request with a key runs the view and stores its response for
+``IDEMPOTENCY_KEY_TTL`` seconds; later requests with the same key (from the
+same user, or for anonymous requests the same client address, to the same
+URL) get that response back, with an ``Idempotent-Replayed: true`` header,
+without running the view again. A retry that arrives while the first request
+is still running gets 409, and reusing a key for a different request body
+gets 422.
+Server errors are not stored, so the request can be retried with the same key.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, QueryDict
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.throttling import BaseThrottle
+
+from .models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = 'conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = 'idempotency_key_reused'
+
+
+def _canonical(value):
+    if isinstance(value, UploadedFile):
+        digest = hashlib.sha256()
+        for chunk in value.chunks():
+            digest.update(chunk)
+        value.seek(0)
+        return {'file': value.name, 'sha256': digest.hexdigest()}
+    return value
+
+
+def request_hash(request):
+    """
+    Hash of the parsed request body, uploaded files by content. Keyed with
+    ``SECRET_KEY`` because bodies can hold passwords.
+    """
+    data = request.data
+    if isinstance(data, QueryDict):
+        data = {name: [_canonical(value) for value in values] for name, values in data.lists()}
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return salted_hmac('core.idempotency', payload, algorithm='sha256').hexdigest()
+
+
+def _claim(scope, key, fingerprint):
+    """Return ``(record, created)``: the live record for this key, or a new in-progress one."""
+    now = timezone.now()
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is not None:
+        if record.expires_at >= now:
+            return record, False
+        record.delete()
+    # Clear a few other expired keys on the way.
+    expired = IdempotencyKey.objects.filter(expires_at__lt=now).values_list('pk', flat=True)[:100]
+    IdempotencyKey.objects.filter(pk__in=list(expired)).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, key=key, request_hash=fingerprint, expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return record, True
+    except IntegrityError:
+        # Another request with the same key got in first.
+        return IdempotencyKey.objects.get(scope=scope, key=key), False
+
+
+class IdempotentCreateMixin:
+    """Honour ``Idempotency-Key`` on ``post()``. Runs after authentication and throttling."""
+
+    def get_idempotency_scope(self, request):
+        if request.user.is_authenticated:
+            return f'{request.user.pk}:{request.path}'
+        return f'ip:{BaseThrottle().get_ident(request)}:{request.path}'
+
+    def post(self, request, *args, **kwargs):
+        self._idempotency_record = None
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({'Idempotency-Key': f"Must be at most {MAX_KEY_LENGTH} characters."})
+
+        fingerprint = request_hash(request)
+        record, created = _claim(self.get_idempotency_scope(request), key, fingerprint)
+        if not created:
+            if record.request_hash != fingerprint:
+                raise IdempotencyKeyReused()
+            if not record.completed:
+                stale = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+                if record.created_at > stale:
+                    raise IdempotencyConflict()
+                # The first request died without finishing; run this one instead,
+                # unless another retry has already taken over.
+                taken = IdempotencyKey.objects.filter(
+                    pk=record.pk, completed=False, created_at=record.created_at,
+                ).update(created_at=timezone.now())
+                if not taken:
+                    raise IdempotencyConflict()
+            else:
+                response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+        self._idempotency_record = record
+        return super().post(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        record = getattr(self, '_idempotency_record', None)
+        if record is not None:
+            self._idempotency_record = None
+            if response.status_code >= 500:
+                record.delete()
+            else:
+                if hasattr(response, 'render'):
+                    response.render()
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    completed=True, status_code=response.status_code,
+                    content_type=response.get('Content-Type', ''), body=response.content,
+                )
+        return response
@@ -0,0 +1,176 @@
+"""
+Database-backed job queue.
+
+Apps register handlers in a ``tasks.py`` module (discovered at startup)::
+
+    @job('products.refresh_aggregates', batch_size=100)
+    def refresh_aggregates(payloads):
+        ...
+
+and enqueue work from inside the transaction that makes it necessary::
+
+    enqueue('products.refresh_aggregates', {'product_id': product.pk},
+            dedupe_key=f'product-aggregates:{product.pk}')
+
+Handlers always receive a list of payloads. With ``batch_size > 1`` a worker
+claims up to that many pending jobs of the same name and hands them over in a
+single call. A job with a ``dedupe_key`` is skipped while another job with the
+same key is still pending. Failed batches are retried with exponential backoff
+until ``max_attempts`` is reached, after which the jobs stay in the table with
+status ``failed`` and the last traceback, and the handler's ``on_failure``
+callback (if any) gets their payloads to clean up after them.
+"""
+import logging
+import random
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+jobs_processed_total = registry.counter(
+    'jobs_processed_total', 'Background jobs processed, by name and result.', ('name', 'result'))
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    name: str
+    func: object
+    batch_size: int = 1
+    max_attempts: int = 5
+    on_failure: object = None
+
+
+_handlers = {}
+
+
+def job(name, batch_size=1, max_attempts=5, on_failure=None):
+    """
+    Register the decorated function as the handler for ``name``.
+    ``on_failure(payloads)`` is called for jobs that have failed for good.
+    """
+    def decorator(func):
+        _handlers[name] = JobHandler(name, func, batch_size, max_attempts, on_failure)
+        return func
+    return decorator
+
+
+def get_handler(name):
+    return _handlers[name]
+
+
+def enqueue(name, payload=None, dedupe_key=None, delay=0):
+    """
+    Add a job to the queue; returns the ``Job``, or ``None`` if an identical
+    job (same ``dedupe_key``) is already pending.
+    """
+    handler = get_handler(name)
+    run_at = timezone.now() + timedelta(seconds=delay)
+    if dedupe_key and Job.objects.filter(dedupe_key=dedupe_key, status=Job.PENDING).exists():
+        return None
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, payload=payload or {}, dedupe_key=dedupe_key,
+                max_attempts=handler.max_attempts, run_at=run_at,
+            )
+    except IntegrityError:
+        # Lost a race with another request enqueuing the same key.
+        return None
+
+
+def backoff_delay(attempts):
+    delay = min(settings.JOBS_MAX_BACKOFF, settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_stale_jobs():
+    """Put jobs whose worker died (locked for too long) back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    count = 0
+    for job_obj in stale:
+        count += _release(job_obj, timezone.now(), 'Worker lock expired.')
+    return count
+
+
+def claim_batch(worker_id):
+    """Claim the next runnable batch of same-named jobs for ``worker_id``."""
+    now = timezone.now()
+    runnable = Job.objects.filter(status=Job.PENDING, run_at__lte=now, name__in=list(_handlers))
+    name = runnable.order_by('run_at', 'id').values_list('name', flat=True).first()
+    if name is None:
+        return None, []
+
+    handler = _handlers[name]
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    candidates = runnable.filter(name=name).order_by('run_at', 'id').values('pk')[:handler.batch_size]
+    Job.objects.filter(pk__in=candidates, status=Job.PENDING).update(
+        status=Job.RUNNING, locked_by=token, locked_at=now, attempts=F('attempts') + 1,
+    )
+    return handler, list(Job.objects.filter(status=Job.RUNNING, locked_by=token).order_by('id'))
+
+
+def _release(job_obj, now, error):
+    """Schedule a retry for a failed job, or mark it as failed for good."""
+    if job_obj.attempts >= job_obj.max_attempts:
+        Job.objects.filter(pk=job_obj.pk).update(status=Job.FAILED, last_error=error, locked_by='', locked_at=None)
+        handler = _handlers.get(job_obj.name)
+        if handler is not None and handler.on_failure is not None:
+            try:
+                handler.on_failure([job_obj.payload])
+            except Exception:
+                logger.exception("on_failure of job '%s' (%s) failed.", job_obj.name, job_obj.pk)
+        return 0
+    retry_at = now + timedelta(seconds=backoff_delay(job_obj.attempts))
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job_obj.pk).update(
+                status=Job.PENDING, run_at=retry_at, last_error=error, locked_by='', locked_at=None,
+            )
+    except IntegrityError:
+        # A newer job with the same dedupe key is already pending and covers this one.
+        Job.objects.filter(pk=job_obj.pk).delete()
+    return 1
+
+
+def run_batch(handler, jobs):
+    try:
+        handler.func([job_obj.payload for job_obj in jobs])
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job batch '%s' failed (%d jobs).", handler.name, len(jobs))
+        now = timezone.now()
+        for job_obj in jobs:
+            _release(job_obj, now, error)
+        jobs_processed_total.inc(len(jobs), name=handler.name, result='failure')
+        return False
+    Job.objects.filter(pk__in=[job_obj.pk for job_obj in jobs]).delete()
+    jobs_processed_total.inc(len(jobs), name=handler.name, result='success')
+    return True
+
+
+def run_pending_jobs(worker_id='inline', max_batches=None):
+    """
+    Process runnable jobs in the current thread until the queue is empty.
+    Returns the number of jobs processed. Used by ``run_workers --once`` and tests.
+    """
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        handler, jobs = claim_batch(worker_id)
+        if not jobs:
+            break
+        run_batch(handler, jobs)
+        processed += len(jobs)
+        batches += 1
+    return processed
@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from products.models import Product, ProductImage
+from products.views import ProductListCreateView
+from reviews.models import Review
+from reviews.views import ReviewListCreateView
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializer and fast-path rendering of the product and review lists. "
+        "Seeds synthetic data inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Number of products to seed.')
+        parser.add_argument('--reviews', type=int, default=2000, help='Number of reviews on the benchmarked product.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per variant; the best run is reported.')
+
+    def handle(self, *args, **options):
+        # Cache hits would be timed instead of rendering, and both variants
+        # would share (and return) the same cached bytes.
+        with override_settings(ALLOWED_HOSTS=['*'], RESPONSE_CACHE_ENABLED=False), transaction.atomic():
+            product = self.seed(options['products'], options['reviews'])
+            factory = APIRequestFactory()
+            cases = [
+                ('product list', ProductListCreateView.as_view(), reverse('product-list-create'), {}),
+                ('review list', ReviewListCreateView.as_view(),
+                 reverse('review-list-create', kwargs={'product_id': product.pk}), {'product_id': product.pk}),
+            ]
+            for label, view, path, kwargs in cases:
+                timings = {}
+                for fast in (False, True):
+                    with override_settings(FAST_LIST_RENDERING=fast):
+                        timings[fast], content = self.best_of(options['repeat'], view, factory, path, kwargs)
+                    if fast and content != reference:
+                        raise CommandError(f"Fast-path output for the {label} differs from the serializer output.")
+                    reference = content
+                self.stdout.write(
+                    f"{label:<13} serializer {timings[False] * 1000:9.1f} ms   "
+                    f"fast path {timings[True] * 1000:9.1f} ms   "
+                    f"speedup {timings[False] / timings[True]:5.1f}x   ({len(reference)} bytes)"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, product_count, review_count):
+        products = Product.objects.bulk_create(
+            Product(name=f'Benchmark product {i:06d}', description='Seeded by benchmark_list_rendering.', price='19.99')
+            for i in range(product_count)
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, image=f'products/{product.pk}/photo-{n}.jpg')
+            for product in products for n in range(2)
+        )
+        users = User.objects.bulk_create(
+            User(username=f'benchmark-user-{i}', password='!') for i in range(review_count)
+        )
+        target = products[0]
+        Review.objects.bulk_create(
+            Review(product=target, user=user, rating=i % 5 + 1, feedback='Seeded review text. ' * 5)
+            for i, user in enumerate(users)
+        )
+        Review.objects.bulk_create(
+            Review(product=product, user=users[0], rating=4, feedback='Seeded review.')
+            for product in products[1:]
+        )
+        return target
+
+    def best_of(self, repeat, view, factory, path, kwargs):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = view(factory.get(path), **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, response.content
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.changes import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove change feed entries that a newer entry for the same object "
+        "supersedes. Safe to run at any time, e.g. daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGES_RETENTION_DAYS,
+                            help='Keep all entries younger than this many days.')
+
+    def handle(self, *args, **options):
+        deleted = compact(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} superseded change log entries."))
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.processes import setup_worker
+
+REQUEUE_INTERVAL = 60
+
+
+def worker_main(worker_id, poll_interval):
+    """Entry point of a worker process: claim and run batches until told to stop."""
+    setup_worker()
+    from core.jobs import claim_batch, requeue_stale_jobs, run_batch
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    last_requeue = 0.0
+    while not stopping:
+        if time.monotonic() - last_requeue > REQUEUE_INTERVAL:
+            requeue_stale_jobs()
+            last_requeue = time.monotonic()
+        handler, jobs = claim_batch(worker_id)
+        if not jobs:
+            time.sleep(poll_interval)
+            continue
+        run_batch(handler, jobs)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run background job workers until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes.')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to sleep when the queue is empty (default: JOBS_POLL_INTERVAL).')
+        parser.add_argument('--once', action='store_true',
+                            help='Process everything that is runnable now in this process, then exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            from core.jobs import requeue_stale_jobs, run_pending_jobs
+            requeue_stale_jobs()
+            processed = run_pending_jobs(worker_id=f'{socket.gethostname()}:{os.getpid()}')
+            self.stdout.write(f"Processed {processed} job(s).")
+            return
+
+        poll_interval = options['poll_interval'] or settings.JOBS_POLL_INTERVAL
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=worker_main,
+                args=(f'{socket.gethostname()}:{os.getpid()}:{index}', poll_interval),
+                daemon=True,
+            )
+            for index in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} worker(s). Press Ctrl+C to stop.")
+
+        def shutdown(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        for process in processes:
+            process.join()
+        self.stdout.write("Workers stopped.")
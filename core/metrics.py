@@ -0,0 +1,316 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Metrics live in a module-level ``registry``. Each metric keeps its samples in a
+plain dict guarded by its own lock, so updates from different metrics never
+contend with each other and an update is a single dict operation.
+
+With several worker processes each one only sees its own requests. When
+``METRICS_DIR`` is set, every process periodically writes a snapshot of its
+registry to ``<METRICS_DIR>/metrics-<pid>-<start>.json`` and the ``/metrics``
+view merges all the snapshots it finds: counters and histograms are summed,
+and so are gauges (each process reports its own share, e.g. requests in
+progress). A process that has exited keeps contributing its counters and
+histograms, so totals never go backwards, but its gauges are dropped because
+they describe a process that no longer exists. The start time in the file name
+keeps a process that is given a reused PID from overwriting the file of the
+one that had it before; of several files with the same PID, only the newest
+can belong to a live process.
+"""
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._samples.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Samples are stored as ``[per-bucket counts..., sum, count]``."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def _copy(self, value):
+        return list(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._last_flush = 0.0
+        self._file_pid = None
+        self._file_name = None
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {
+            metric.name: {
+                'type': metric.type,
+                'help': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'samples': metric.snapshot(),
+            }
+            for metric in self._metrics.values()
+        }
+
+    # --- Multi-process support ---
+
+    def flush(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        pid = os.getpid()
+        if self._file_pid != pid:
+            # Named on first flush rather than at import, so forked workers
+            # each get their own start time.
+            self._file_pid, self._file_name = pid, f'metrics-{pid}-{time.time_ns()}.json'
+        path = directory / self._file_name
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        if directory and time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush(directory)
+
+    def collect(self):
+        """Return a snapshot merged across all processes sharing ``METRICS_DIR``."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        files = []
+        for path in sorted(Path(directory).glob('metrics-*.json')):
+            try:
+                pid, _, started = path.stem.removeprefix('metrics-').partition('-')
+                files.append((path, int(pid), int(started or 0)))
+            except ValueError:
+                continue
+        newest = {}
+        for _, pid, started in files:
+            newest[pid] = max(started, newest.get(pid, started))
+        merged = {}
+        for path, pid, started in files:
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            alive = started == newest[pid] and _pid_alive(pid)
+            for name, data in snapshot.items():
+                if data['type'] == 'gauge' and not alive:
+                    continue
+                target = merged.setdefault(name, {**data, 'samples': {}})
+                for labels, value in data['samples']:
+                    key = tuple(labels)
+                    current = target['samples'].get(key)
+                    if current is None:
+                        target['samples'][key] = value
+                    elif isinstance(value, list):
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = current + value
+        for data in merged.values():
+            data['samples'] = [[list(key), value] for key, value in data['samples'].items()]
+        return merged
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Render a registry snapshot in the Prometheus text exposition format."""
+    lines = []
+    for name, data in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['type']}")
+        labelnames = data['labelnames']
+        for labels, value in sorted(data['samples']):
+            if data['type'] == 'histogram':
+                cumulative = 0
+                bounds = data['buckets'] + [math.inf]
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    le = _format_labels(labelnames, labels, ('le', _format_value(float(bound))))
+                    lines.append(f'{name}_bucket{le} {cumulative}')
+                label_str = _format_labels(labelnames, labels)
+                lines.append(f'{name}_sum{label_str} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{label_str} {value[-1]}')
+            else:
+                lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    'http_requests_total', 'Total HTTP requests by route, method and status.', ('route', 'method', 'status'))
+http_request_duration_seconds = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route and method.', ('route', 'method'))
+http_requests_in_progress = registry.gauge(
+    'http_requests_in_progress', 'HTTP requests currently being handled.')
+db_queries_total = registry.counter(
+    'db_queries_total', 'Database queries executed, by route.', ('route',))
+db_query_duration_seconds = registry.histogram(
+    'db_query_duration_seconds', 'Database query latency.',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+auth_login_attempts_total = registry.counter(
+    'auth_login_attempts_total', 'Login attempts by result.', ('result',))
+cache_requests_total = registry.counter(
+    'cache_requests_total', 'Response cache lookups by view and result.', ('view', 'result'))
+
+
+class _QueryRecorder:
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            db_query_duration_seconds.observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """Count requests and record per-route latency and query counts."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        status = 500
+        try:
+            with connections['default'].execute_wrapper(recorder):
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            match = request.resolver_match
+            route = (match.url_name or match.view_name) if match else '<unmatched>'
+            http_requests_total.inc(route=route, method=request.method, status=status)
+            http_request_duration_seconds.observe(duration, route=route, method=request.method)
+            db_queries_total.inc(recorder.count, route=route)
+            registry.maybe_flush()
@@ -0,0 +1,111 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work, picked up by ``manage.py run_workers``.
+
+    Jobs are written in the same transaction as the change that needs them,
+    so they are never lost and never run for a change that was rolled back.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_job_status_run_at_idx'),
+        ]
+        constraints = [
+            # Only one job per key may be waiting; a running job does not block a new one.
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=Q(status='pending'), name='core_job_unique_pending_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class Event(models.Model):
+    """A published server-sent event, used by ``core.events.DatabaseBackend``."""
+    topic = models.CharField(max_length=100)
+    event = models.CharField(max_length=50)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'id'], name='core_event_topic_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} on {self.topic} #{self.pk}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only record of catalog writes, read by the ``/api/changes/`` feed.
+    The id is the feed cursor.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, 'Created or updated'),
+        (DELETE, 'Deleted'),
+    ]
+
+    kind = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Finding newer entries for the same object when compacting.
+            models.Index(fields=['kind', 'object_id', 'id'], name='core_changelog_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.kind} {self.object_id}"
+
+
+class IdempotencyKey(models.Model):
+    """The stored response to a write request sent with an ``Idempotency-Key`` header."""
+    scope = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    # Keyed hash of the request body; a key may not be reused for a different request.
+    request_hash = models.CharField(max_length=64, blank=True)
+    completed = models.BooleanField(default=False)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.BinaryField(default=b'')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='core_idempotency_scope_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.scope})"
@@ -0,0 +1,11 @@
+"""
+Helpers for child processes started with ``multiprocessing`` or a
+``ProcessPoolExecutor``. Keep this module free of model imports: under the
+'spawn' start method it is imported in the child before Django is set up.
+"""
+
+
+def setup_worker():
+    """Set up Django in a child process; pass as a pool ``initializer``."""
+    import django
+    django.setup()
@@ -0,0 +1,164 @@
+"""
+Opt-in per-request profiling.
+
+When ``PROFILING_ENABLED`` is set, ``ProfilingMiddleware`` records the query
+count and the time spent in the database, in authentication, in serializers
+(including image URL building) and in the view for every request. The numbers
+are sent back as a ``Server-Timing`` header and a sample of requests is written
+to the ``core.profiling`` logger as one JSON object per line.
+
+When profiling is disabled the middleware raises ``MiddlewareNotUsed`` so
+Django drops it from the chain at startup, and none of the DRF hooks below are
+installed.
+"""
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import fields, serializers
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_current_profile = ContextVar('request_profile', default=None)
+_hooks_installed = False
+
+
+class RequestProfile:
+    """Timings collected for a single request, in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.view_started = None
+        self.view_finished = None
+        self.query_count = 0
+        self.timings = defaultdict(float)
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.timings['db'] += time.perf_counter() - start
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.view_started is not None:
+            self.timings['view'] = (self.view_finished or self.finished) - self.view_started
+        self.timings['total'] = self.finished - self.started
+
+    def as_dict(self):
+        data = {f'{name}_ms': round(duration * 1000, 3) for name, duration in self.timings.items()}
+        data['queries'] = self.query_count
+        return data
+
+    def server_timing(self):
+        parts = []
+        for name, duration in self.timings.items():
+            entry = f'{name};dur={duration * 1000:.3f}'
+            if name == 'db':
+                entry += f';desc="{self.query_count} queries"'
+            parts.append(entry)
+        return ', '.join(parts)
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to the current request's ``name`` timing."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] += time.perf_counter() - start
+
+
+def _timed_function(name, func):
+    def wrapper(*args, **kwargs):
+        with timed(name):
+            return func(*args, **kwargs)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def install_hooks():
+    """
+    Wrap the DRF entry points we want to time.
+
+    Only the top-level ``.data`` of a serializer is timed; nested serializers
+    go through ``to_representation`` so they are not counted twice.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        cls.data = property(_timed_function('serialize', cls.data.fget))
+    fields.FileField.to_representation = _timed_function('media', fields.FileField.to_representation)
+    APIView.perform_authentication = _timed_function('auth', APIView.perform_authentication)
+    _hooks_installed = True
+
+
+class ProfilingMiddleware:
+    """
+    Attach ``Server-Timing`` headers to every response and log a sample of
+    request profiles. Should be placed first in ``MIDDLEWARE``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_LOG_SAMPLE_RATE
+        install_hooks()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        profile.finish()
+
+        response['Server-Timing'] = profile.server_timing()
+        if self.sample_rate and random.random() < self.sample_rate:
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'route': request.resolver_match.view_name if request.resolver_match else None,
+                'status': response.status_code,
+                **profile.as_dict(),
+            }
+            logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so this is where the view ends.
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.view_finished = time.perf_counter()
+        return response
@@ -0,0 +1,31 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with the shared response and throttle caches in fresh
+    directories, so entries left by a previous run (or by a development
+    server) are never served.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dirs = []
+        caches = {**settings.CACHES}
+        for alias in (settings.RESPONSE_CACHE, settings.THROTTLE_CACHE):
+            directory = tempfile.mkdtemp(prefix=f'opiniona-test-{alias}-')
+            self._cache_dirs.append(directory)
+            caches[alias] = {**caches[alias], 'LOCATION': directory}
+        self._cache_settings = override_settings(CACHES=caches)
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        for directory in self._cache_dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
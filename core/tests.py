@@ -0,0 +1,590 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.models import Product
+from reviews.models import Review
+from .admin import ApproximateCountPaginator
+from .caching import acquire_refresh, release_refresh, wait_for_refresh
+from .checks import check_events_backend, check_response_cache, check_throttle_cache
+from .events import DatabaseBackend, LocalBackend
+from .filecache import FileBasedCache
+from .jobs import enqueue, job, requeue_stale_jobs, run_pending_jobs
+from .metrics import Histogram, Registry, render
+from .models import ChangeLogEntry, IdempotencyKey, Job
+
+
+class ProfilingMiddlewareTests(APITestCase):
+    """
+    Test suite for the opt-in request profiling middleware.
+    """
+
+    def setUp(self):
+        Product.objects.create(name='Test Headphones', description='Closed-back headphones.', price='79.99')
+
+    def test_no_server_timing_when_disabled(self):
+        response = self.client.get(reverse('product-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_LOG_SAMPLE_RATE=0)
+    def test_server_timing_header_when_enabled(self):
+        response = self.client.get(reverse('product-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header = response['Server-Timing']
+        for name in ('db', 'serialize', 'view', 'total'):
+            self.assertIn(f'{name};dur=', header)
+        self.assertIn('queries"', header)
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_LOG_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_logged(self):
+        with self.assertLogs('core.profiling', level='INFO') as logs:
+            self.client.get(reverse('product-list-create'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'product-list-create')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+
+
+class MetricsTests(APITestCase):
+    """
+    Test suite for the metrics registry and the /metrics endpoint.
+    """
+
+    def test_metrics_endpoint_reports_route_counters(self):
+        self.client.get(reverse('product-list-create'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_requests_total counter', body)
+        self.assertIn('http_requests_total{route="product-list-create",method="GET",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="product-list-create",method="GET",le="+Inf"}', body)
+
+    def test_metrics_endpoint_is_restricted(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with override_settings(METRICS_ALLOWED_IPS=['203.0.113.0/24']):
+            response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with override_settings(METRICS_ENABLED=False):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token_is_required_when_set(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_histogram_rendering(self):
+        histogram = Histogram('test_latency_seconds', 'Test latency.', ('route',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, route='a')
+        histogram.observe(0.5, route='a')
+        histogram.observe(5, route='a')
+        registry = Registry()
+        registry.register(histogram)
+        body = render(registry.snapshot())
+        self.assertIn('test_latency_seconds_bucket{route="a",le="0.1"} 1', body)
+        self.assertIn('test_latency_seconds_bucket{route="a",le="1.0"} 2', body)
+        self.assertIn('test_latency_seconds_bucket{route="a",le="+Inf"} 3', body)
+        self.assertIn('test_latency_seconds_count{route="a"} 3', body)
+
+    def test_snapshots_are_merged_across_processes(self):
+        registry = Registry()
+        counter = registry.counter('test_jobs_total', 'Test counter.', ('kind',))
+        counter.inc(2, kind='x')
+        with tempfile.TemporaryDirectory() as directory:
+            other = {'test_jobs_total': {
+                'type': 'counter', 'help': 'Test counter.', 'labelnames': ['kind'],
+                'buckets': [], 'samples': [[['x'], 3], [['y'], 1]],
+            }}
+            Path(directory, 'metrics-99999.json').write_text(json.dumps(other))
+            with override_settings(METRICS_DIR=directory):
+                body = render(registry.collect())
+        self.assertIn('test_jobs_total{kind="x"} 5', body)
+        self.assertIn('test_jobs_total{kind="y"} 1', body)
+
+    def test_gauges_of_exited_processes_are_dropped(self):
+        registry = Registry()
+        registry.gauge('test_in_progress', 'Test gauge.')
+        snapshot = {'test_in_progress': {
+            'type': 'gauge', 'help': 'Test gauge.', 'labelnames': [], 'buckets': [], 'samples': [[[], 2]],
+        }}
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, 'metrics-99998.json').write_text(json.dumps(snapshot))
+            with mock.patch('core.metrics._pid_alive', return_value=True):
+                with override_settings(METRICS_DIR=directory):
+                    self.assertIn('test_in_progress 2', render(registry.collect()))
+            with mock.patch('core.metrics._pid_alive', return_value=False):
+                with override_settings(METRICS_DIR=directory):
+                    self.assertNotIn('test_in_progress 2', render(registry.collect()))
+
+    def test_reused_pid_does_not_overwrite_an_exited_process(self):
+        registry = Registry()
+        registry.counter('test_jobs_total', 'Test counter.')
+        registry.gauge('test_in_progress', 'Test gauge.')
+
+        def snapshot(jobs, in_progress):
+            return {
+                'test_jobs_total': {'type': 'counter', 'help': 'Test counter.', 'labelnames': [], 'buckets': [],
+                                    'samples': [[[], jobs]]},
+                'test_in_progress': {'type': 'gauge', 'help': 'Test gauge.', 'labelnames': [], 'buckets': [],
+                                     'samples': [[[], in_progress]]},
+            }
+
+        with tempfile.TemporaryDirectory() as directory:
+            # The process that had PID 99997 before, and the one that has it now.
+            Path(directory, 'metrics-99997-100.json').write_text(json.dumps(snapshot(5, 3)))
+            Path(directory, 'metrics-99997-200.json').write_text(json.dumps(snapshot(2, 1)))
+            with mock.patch('core.metrics._pid_alive', return_value=True), override_settings(METRICS_DIR=directory):
+                body = render(registry.collect())
+            own_files = list(Path(directory).glob(f'metrics-{os.getpid()}-*.json'))
+        self.assertIn('test_jobs_total 7', body)
+        self.assertIn('test_in_progress 1', body)
+        self.assertEqual(len(own_files), 1)
+
+
+TIGHT_THROTTLE_RATES = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'login': '3/min', 'login_user': '2/min', 'register': '1/hour', 'review_write': '1/hour'},
+}
+
+
+@override_settings(REST_FRAMEWORK=TIGHT_THROTTLE_RATES)
+class ThrottlingTests(APITestCase):
+    """
+    Test suite for the token-bucket throttles on login, registration and review writes.
+    """
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.product = Product.objects.create(name='Test Speaker', description='A speaker.', price='49.99')
+
+    def tearDown(self):
+        caches[settings.THROTTLE_CACHE].clear()
+
+    def test_login_is_throttled_per_username_before_any_query(self):
+        url = reverse('login')
+        for _ in range(2):
+            response = self.client.post(url, {'username': 'testuser', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'username': 'TestUser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_login_is_throttled_per_ip(self):
+        url = reverse('login')
+        for username in ('a', 'b', 'c'):
+            self.client.post(url, {'username': username, 'password': 'wrong'})
+        response = self.client.post(url, {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_registration_is_throttled(self):
+        url = reverse('register')
+        data = {'username': 'first', 'email': 'first@example.com', 'password': 'testpass123', 'password2': 'testpass123'}
+        self.assertEqual(self.client.post(url, data).status_code, status.HTTP_201_CREATED)
+
+        data = {**data, 'username': 'second', 'email': 'second@example.com'}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(User.objects.filter(username='second').exists())
+
+    def test_forwarded_for_header_does_not_pick_the_bucket(self):
+        url = reverse('register')
+        data = {'username': 'first', 'email': 'first@example.com', 'password': 'testpass123', 'password2': 'testpass123'}
+        self.client.post(url, data, HTTP_X_FORWARDED_FOR='198.51.100.1')
+        data = {**data, 'username': 'second', 'email': 'second@example.com'}
+        response = self.client.post(url, data, HTTP_X_FORWARDED_FOR='198.51.100.2')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_buckets_are_shared_between_processes(self):
+        url = reverse('register')
+        data = {'username': 'first', 'email': 'first@example.com', 'password': 'testpass123', 'password2': 'testpass123'}
+        # Another worker process has its own cache object on the same location.
+        worker_cache = FileBasedCache(settings.CACHES[settings.THROTTLE_CACHE]['LOCATION'], {})
+        worker_cache.set('throttle:register:127.0.0.1', (0, time.time()), 3600)
+        self.assertEqual(self.client.post(url, data).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bucket_lock_is_taken_once(self):
+        throttle_cache = caches[settings.THROTTLE_CACHE]
+        other = FileBasedCache(settings.CACHES[settings.THROTTLE_CACHE]['LOCATION'], {})
+        self.assertTrue(throttle_cache.add('throttle:test:lock', 1, 1))
+        self.assertFalse(other.add('throttle:test:lock', 1, 1))
+        throttle_cache.set('throttle:test:lock', 1, -1)
+        self.assertTrue(other.add('throttle:test:lock', 1, 1))
+
+    def test_per_process_throttle_cache_is_flagged(self):
+        self.assertEqual(check_throttle_cache(None), [])
+        with override_settings(THROTTLE_CACHE='default'):
+            self.assertEqual([warning.id for warning in check_throttle_cache(None)], ['core.W002'])
+
+    def test_review_writes_are_throttled_per_user_but_reads_are_not(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+        self.assertEqual(self.client.post(url, {'rating': 5, 'feedback': 'Good.'}).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url, {'rating': 1, 'feedback': 'Again.'}).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+
+processed_batches = []
+
+
+@job('tests.record', batch_size=10)
+def record_batch(payloads):
+    processed_batches.append([payload['n'] for payload in payloads])
+
+
+@job('tests.fail', max_attempts=2)
+def always_fail(payloads):
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(APITestCase):
+    """
+    Test suite for the database-backed job queue.
+    """
+
+    def setUp(self):
+        processed_batches.clear()
+
+    def test_jobs_of_the_same_name_are_batched(self):
+        for n in range(3):
+            enqueue('tests.record', {'n': n})
+        self.assertEqual(run_pending_jobs(), 3)
+        self.assertEqual(processed_batches, [[0, 1, 2]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_pending_jobs_are_deduplicated(self):
+        first = enqueue('tests.record', {'n': 1}, dedupe_key='same')
+        second = enqueue('tests.record', {'n': 2}, dedupe_key='same')
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_failed_jobs_are_retried_with_backoff_then_marked_failed(self):
+        enqueue('tests.fail')
+        with self.assertLogs('core.jobs', level='ERROR'):
+            run_pending_jobs()
+        job_obj = Job.objects.get()
+        self.assertEqual(job_obj.status, Job.PENDING)
+        self.assertEqual(job_obj.attempts, 1)
+        self.assertGreater(job_obj.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job_obj.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', level='ERROR'):
+            run_pending_jobs()
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, Job.FAILED)
+        self.assertEqual(job_obj.attempts, 2)
+
+    def test_stale_running_jobs_are_requeued(self):
+        enqueue('tests.record', {'n': 7})
+        Job.objects.update(status=Job.RUNNING, locked_by='dead-worker', attempts=1,
+                           locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(Job.objects.get().status, Job.PENDING)
+
+    def test_run_workers_once_drains_the_queue(self):
+        enqueue('tests.record', {'n': 1})
+        out = StringIO()
+        call_command('run_workers', '--once', stdout=out)
+        self.assertIn('Processed 1 job(s).', out.getvalue())
+        self.assertEqual(processed_batches, [[1]])
+
+
+class ChangesFeedTests(APITestCase):
+    """
+    Test suite for the /api/changes/ delta feed.
+    """
+
+    def setUp(self):
+        self.url = reverse('changes')
+        self.user = User.objects.create_user(username='reviewer', password='password123')
+
+    def sync(self, since, limit=None):
+        params = {'since': since} if limit is None else {'since': since, 'limit': limit}
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_returns_latest_state_and_tombstones(self):
+        start = self.sync(0)['cursor']
+        keyboard = Product.objects.create(name='Keyboard', description='Clicky.', price='50.00')
+        mouse = Product.objects.create(name='Mouse', description='Small.', price='20.00')
+        review = Review.objects.create(product=keyboard, user=self.user, rating=4, feedback='Good.')
+        keyboard.name = 'Mechanical Keyboard'
+        keyboard.save()
+
+        page = self.sync(start)
+        self.assertFalse(page['has_more'])
+        changes = {(change['kind'], change['id']): change for change in page['changes']}
+        self.assertEqual(len(page['changes']), 3)
+        self.assertEqual(changes['product', keyboard.pk]['data']['name'], 'Mechanical Keyboard')
+        self.assertEqual(changes['review', review.pk]['data']['user'], 'reviewer')
+
+        mouse.deleted_at = timezone.now()
+        mouse.save()
+        review.delete()
+        page = self.sync(page['cursor'])
+        self.assertEqual(
+            sorted((change['kind'], change['action']) for change in page['changes']),
+            [('product', 'delete'), ('review', 'delete')],
+        )
+        self.assertEqual(self.sync(page['cursor'])['changes'], [])
+
+    def test_feed_pages_are_bounded(self):
+        start = self.sync(0)['cursor']
+        for i in range(5):
+            Product.objects.create(name=f'Cable {i}', description='A cable.', price='5.00')
+        first = self.sync(start, limit=3)
+        self.assertTrue(first['has_more'])
+        self.assertEqual(len(first['changes']), 3)
+        second = self.sync(first['cursor'], limit=3)
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(second['changes']), 2)
+
+    def test_compaction_keeps_only_the_latest_entry_per_object(self):
+        product = Product.objects.create(name='Lamp', description='Bright.', price='30.00')
+        for price in ('31.00', '32.00'):
+            product.price = price
+            product.save()
+        ChangeLogEntry.objects.update(created_at=timezone.now() - timedelta(days=30))
+
+        call_command('compact_changes', days=7, stdout=StringIO())
+        entries = ChangeLogEntry.objects.filter(kind='product', object_id=product.pk)
+        self.assertEqual(entries.count(), 1)
+        self.assertEqual(self.sync(0)['changes'][-1]['data']['price'], '32.00')
+
+
+class IdempotencyTests(APITestCase):
+    """
+    Test suite for Idempotency-Key handling on write endpoints.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='password123', email='admin@example.com')
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('product-list-create')
+        self.data = {'name': 'Lamp', 'description': 'Bright.', 'price': '30.00'}
+
+    def test_duplicate_key_replays_without_running_the_view(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        with self.assertNumQueries(1):
+            retry = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_key_in_progress_conflicts_until_stale(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='busy')
+        IdempotencyKey.objects.update(completed=False)
+        response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='busy')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='busy')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_only_one_retry_takes_over_a_stale_key(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='stale')
+        IdempotencyKey.objects.update(completed=False, created_at=timezone.now() - timedelta(minutes=5))
+        stale = IdempotencyKey.objects.get()
+        # Another retry takes the key over between this one's read and its update.
+        IdempotencyKey.objects.update(created_at=timezone.now())
+        with mock.patch('core.idempotency._claim', return_value=(stale, False)):
+            response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='stale')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_expired_and_foreign_keys_do_not_replay(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='old')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='old')
+
+        other_admin = User.objects.create_superuser(username='admin2', password='password123', email='a2@example.com')
+        self.client.force_authenticate(other_admin)
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='old')
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_key_reused_with_a_different_body_is_refused(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.post(
+            self.url, {**self.data, 'price': '1.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc',
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertTrue(IdempotencyKey.objects.get().request_hash)
+
+    def test_anonymous_keys_are_scoped_by_client_address(self):
+        self.client.force_authenticate(None)
+        url = reverse('register')
+        data = {'username': 'alice', 'password': 'S3cure-pass!', 'password2': 'S3cure-pass!', 'email': 'alice@example.com'}
+        first = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='k', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        other = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='k', REMOTE_ADDR='10.0.0.2')
+        self.assertNotIn('Idempotent-Replayed', other)
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SingleFlightTests(APITestCase):
+    """
+    Test suite for the response cache's single-flight rebuild lock.
+    """
+
+    def test_only_one_request_rebuilds_a_key(self):
+        token = acquire_refresh('response:a')
+        self.assertIsNotNone(token)
+        self.assertIsNone(acquire_refresh('response:a'))
+        release_refresh('response:a', token)
+        token = acquire_refresh('response:a')
+        self.assertIsNotNone(token)
+        release_refresh('response:a', token)
+
+    def test_lock_is_shared_through_the_cache(self):
+        # Held by another process: only the cache entry exists here.
+        cache = caches[settings.RESPONSE_CACHE]
+        cache.add('lock:response:c', 'other-process', 10)
+        self.assertIsNone(acquire_refresh('response:c'))
+        cache.delete('lock:response:c')
+        token = acquire_refresh('response:c')
+        self.assertIsNotNone(token)
+        release_refresh('response:c', token)
+
+    def test_waiters_wake_when_the_rebuild_finishes(self):
+        token = acquire_refresh('response:d')
+        threading.Timer(0.1, release_refresh, ('response:d', token)).start()
+        started = time.monotonic()
+        wait_for_refresh('response:d')
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertIsNone(caches[settings.RESPONSE_CACHE].get('lock:response:d'))
+
+
+class SharedResponseCacheTests(APITestCase):
+    """
+    Test suite for sharing the response cache between processes.
+    """
+
+    def test_invalidation_from_another_process_is_seen(self):
+        from .caching import _version_key
+
+        product = Product.objects.create(name='Lamp', description='Bright.', price='30.00')
+        url = reverse('product-detail', kwargs={'pk': product.pk})
+        self.client.get(url)
+        Product.objects.filter(pk=product.pk).update(name='Desk Lamp')
+        # A job worker process has its own cache object on the same location.
+        worker_cache = FileBasedCache(settings.CACHES[settings.RESPONSE_CACHE]['LOCATION'], {})
+        worker_cache.set(_version_key(f'product:{product.pk}'), 'bumped-by-worker', None)
+
+        self.assertEqual(json.loads(self.client.get(url).content)['name'], 'Desk Lamp')
+
+    def test_per_process_response_cache_is_flagged(self):
+        self.assertEqual(check_response_cache(None), [])
+        with override_settings(RESPONSE_CACHE='default'):
+            self.assertEqual([warning.id for warning in check_response_cache(None)], ['core.W001'])
+
+
+class ApproximateCountPaginatorTests(APITestCase):
+    """
+    Test suite for the admin paginator used on large tables.
+    """
+
+    def setUp(self):
+        Product.objects.bulk_create(
+            Product(name=f'Product {i}', description='A product.', price='1.00') for i in range(12)
+        )
+
+    def test_unfiltered_count_is_estimated_above_the_limit(self):
+        paginator = ApproximateCountPaginator(Product.objects.order_by('-id'), 5)
+        paginator.limit = 10
+        max_pk = Product.objects.order_by('-pk').first().pk
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, max_pk)
+
+    def test_filtered_and_small_counts_are_exact_up_to_the_limit(self):
+        self.assertEqual(ApproximateCountPaginator(Product.objects.order_by('id'), 5).count, 12)
+        paginator = ApproximateCountPaginator(Product.objects.filter(name__startswith='Product').order_by('id'), 5)
+        paginator.limit = 10
+        self.assertEqual(paginator.count, 10)
+
+
+@override_settings(EVENTS_REPLAY_SIZE=10, EVENTS_POLL_INTERVAL=0.01)
+class EventBrokerTests(TransactionTestCase):
+    """
+    Test suite for the server-sent events broker backends.
+    """
+
+    async def collect(self, stream, count):
+        items = []
+        while len(items) < count:
+            item = await asyncio.wait_for(anext(stream), 2)
+            if item is not None:
+                items.append(item)
+        return items
+
+    async def test_local_backend_fans_out_and_resumes(self):
+        backend = LocalBackend()
+        first = backend.publish('product:1', 'review', {'n': 1})
+        backend.publish('product:1', 'review', {'n': 2})
+        backend.publish('product:2', 'review', {'n': 99})
+
+        stream = backend.subscribe('product:1', last_event_id=first, heartbeat=0.05)
+        [resumed] = await self.collect(stream, 1)
+        self.assertEqual(resumed[1:], ('review', {'n': 2}))
+
+        # Publishing from another thread reaches the subscriber's event loop.
+        await asyncio.to_thread(backend.publish, 'product:1', 'aggregate', {'n': 3})
+        [live] = await self.collect(stream, 1)
+        self.assertEqual(live[1:], ('aggregate', {'n': 3}))
+        await stream.aclose()
+        self.assertFalse(backend._subscribers)
+
+    async def test_last_event_id_from_before_a_restart_is_ignored(self):
+        backend = LocalBackend()
+        stream = backend.subscribe('product:1', last_event_id=500, heartbeat=0.05)
+        await asyncio.wait_for(anext(stream), 2)
+        backend.publish('product:1', 'review', {'n': 1})
+        [live] = await self.collect(stream, 1)
+        self.assertEqual(live, (1, 'review', {'n': 1}))
+        await stream.aclose()
+
+    def test_local_events_backend_is_flagged(self):
+        self.assertEqual(check_events_backend(None), [])
+        with override_settings(EVENTS_BACKEND='core.events.LocalBackend'):
+            self.assertEqual([warning.id for warning in check_events_backend(None)], ['core.W003'])
+
+    async def test_database_backend_shares_events_between_instances(self):
+        publisher, consumer = DatabaseBackend(), DatabaseBackend()
+        first = await sync_to_async(publisher.publish)('product:1', 'review', {'n': 1})
+        stream = consumer.subscribe('product:1', last_event_id=first - 1, heartbeat=0.05)
+        [backlog] = await self.collect(stream, 1)
+        self.assertEqual(backlog, (first, 'review', {'n': 1}))
+
+        await sync_to_async(publisher.publish)('product:1', 'review', {'n': 2})
+        [live] = await self.collect(stream, 1)
+        self.assertEqual(live[1:], ('review', {'n': 2}))
+        await stream.aclose()
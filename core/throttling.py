@@ -0,0 +1,123 @@
+"""
+Token-bucket throttles for the expensive write endpoints.
+
+Rates use DRF's ``'N/period'`` strings from ``DEFAULT_THROTTLE_RATES``: a
+bucket holds up to N tokens and refills at N per period, so clients get a burst
+of N requests and then a steady N per period. Each bucket is a single
+``(tokens, timestamp)`` pair in the ``THROTTLE_CACHE`` cache, which every
+worker process shares. A bucket is read and written under a short lock key
+taken with ``cache.add()``, so concurrent requests cannot both spend the last
+token. Client IPs come from DRF's ``get_ident()``, which only trusts
+``X-Forwarded-For`` as far as ``NUM_PROXIES`` allows.
+
+Throttles run in ``APIView.initial()``, before the handler, so rejected
+requests never reach password hashing or the database.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+# A crashed request's bucket lock expires after this many seconds.
+LOCK_TIMEOUT = 1
+# How long a request waits for a bucket another request holds.
+LOCK_WAIT = 0.2
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE]
+        self.retry_after = None
+        super().__init__()
+
+    def get_rate(self):
+        # Read the rates on every instantiation so settings overrides apply.
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        capacity = self.num_requests
+        refill_rate = capacity / self.duration
+        if not self.lock(key):
+            # Someone is hammering this very bucket; treat it as empty.
+            self.retry_after = 1 / refill_rate
+            return False
+        try:
+            now = self.timer()
+            tokens, updated = self.cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.cache.set(key, (tokens, now), self.duration)
+        finally:
+            self.cache.delete(f'{key}:lock')
+        if not allowed:
+            self.retry_after = (1 - tokens) / refill_rate
+        return allowed
+
+    def lock(self, key):
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self.cache.add(f'{key}:lock', 1, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """Login attempts per client IP."""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(TokenBucketThrottle):
+    """Login attempts per target username, whichever IP they come from."""
+    scope = 'login_user'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not username:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': str(username).lower()}
+
+
+class RegistrationRateThrottle(TokenBucketThrottle):
+    """Registrations per client IP."""
+    scope = 'register'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class ReviewWriteRateThrottle(TokenBucketThrottle):
+    """Review submissions per user; reads are never throttled."""
+    scope = 'review_write'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,59 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .changes import read_changes
+from .metrics import registry, render
+
+
+def _metrics_allowed(request):
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_IPS)
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Expose the metrics registry in the Prometheus text format, to clients in
+    ``METRICS_ALLOWED_IPS`` that send ``METRICS_TOKEN`` (when one is set) as
+    a bearer token. Anyone else gets a 404.
+    """
+    if not settings.METRICS_ENABLED or not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ChangesView(APIView):
+    """
+    Catalog changes after a cursor, for clients that keep a local copy.
+
+    Start with ``?since=0`` and keep passing the returned ``cursor`` until
+    ``has_more`` is false; poll again later with the last cursor.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', settings.CHANGES_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError("'since' and 'limit' must be integers.")
+        if since < 0 or limit < 1:
+            raise ValidationError("'since' must not be negative and 'limit' must be positive.")
+        changes, cursor, has_more = read_changes(
+            since, min(limit, settings.CHANGES_PAGE_SIZE), context={'request': request},
+        )
+        return Response({'cursor': cursor, 'has_more': has_more, 'changes': changes})
@@ -3,6 +3,10 @@ ASGI config for product_review_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run under an ASGI server (e.g. ``uvicorn product_review_system.asgi:application``)
+to serve the live review streams at ``/api/products/<id>/reviews/stream/``: each
+open stream then costs a suspended coroutine instead of a whole worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
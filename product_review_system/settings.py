@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -66,9 +68,12 @@ INSTALLED_APPS = [
     'accounts.apps.AccountsConfig',
     'products.apps.ProductsConfig',
     'reviews.apps.ReviewsConfig',
+    'core.apps.CoreConfig',
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -154,6 +159,13 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Resumable chunked image uploads (see products/uploads.py). Partial files are
+# kept outside MEDIA_ROOT until they are complete and validated.
+CHUNKED_UPLOAD_DIR = env_vars.get('CHUNKED_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'opiniona-uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+CHUNKED_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60
 # ---------------------------------
 
 # Default primary key field type
@@ -174,5 +186,156 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
     ],
+    # Number of reverse proxies in front of the app. Throttles take the client
+    # IP from X-Forwarded-For only this many hops in; with 0 they use the
+    # connecting address, so clients cannot pick their own throttle bucket.
+    'NUM_PROXIES': int(env_vars.get('NUM_PROXIES', '0')),
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '30/min',
+        'login_user': '10/min',
+        'register': '30/hour',
+        'review_write': '20/hour',
+    },
 }
+
+# --- Caching ---
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'opiniona',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Shared by every web and job worker process, so that a write in one of
+    # them invalidates the cached responses served by all the others.
+    'responses': {
+        'BACKEND': 'core.filecache.FileBasedCache',
+        'LOCATION': env_vars.get('RESPONSE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'opiniona-responses')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Throttle buckets, shared by every web worker so limits are not
+    # multiplied by the number of processes.
+    'throttles': {
+        'BACKEND': 'core.filecache.FileBasedCache',
+        'LOCATION': env_vars.get('THROTTLE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'opiniona-throttles')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Cache alias holding the throttle token buckets (see core/throttling.py).
+# Must be shared by all processes; a per-process cache triggers core.W002.
+THROTTLE_CACHE = 'throttles'
+
+# Cached product and review reads with precompressed variants (see core/caching.py).
+RESPONSE_CACHE_ENABLED = env_vars.get('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+# Must be a cache all processes share (file, database, Redis, Memcached);
+# a per-process cache triggers the core.W001 system check warning.
+RESPONSE_CACHE = 'responses'
+RESPONSE_CACHE_TIMEOUT = int(env_vars.get('RESPONSE_CACHE_TIMEOUT', '300'))
+# Outdated entries are still served for this long while one request rebuilds them.
+RESPONSE_CACHE_STALE_TTL = int(env_vars.get('RESPONSE_CACHE_STALE_TTL', '3600'))
+# Upper bound on a rebuild; a crashed rebuilder's lock expires after this.
+RESPONSE_CACHE_LOCK_TIMEOUT = int(env_vars.get('RESPONSE_CACHE_LOCK_TIMEOUT', '10'))
+
+# Tests get a response cache directory of their own (see core/testing.py).
+TEST_RUNNER = 'core.testing.TestRunner'
+# ---------------
 # -----------------------------------------
+
+# --- Request Profiling ---
+# Adds Server-Timing headers and logs a sample of request profiles.
+# When disabled the middleware removes itself at startup.
+PROFILING_ENABLED = env_vars.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_LOG_SAMPLE_RATE = float(env_vars.get('PROFILING_LOG_SAMPLE_RATE', '0.01'))
+# -------------------------
+
+# --- Metrics ---
+# Served in the Prometheus text format at /metrics.
+# Set METRICS_DIR to a directory shared by all worker processes so that
+# /metrics reports totals across workers instead of a single process.
+# Only the addresses or networks in METRICS_ALLOWED_IPS (comma-separated)
+# may read /metrics; everyone else gets a 404. Behind a reverse proxy on the
+# same machine every request comes from 127.0.0.1, so also set METRICS_TOKEN
+# and have the scraper send it as 'Authorization: Bearer <token>'.
+METRICS_ENABLED = env_vars.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_ALLOWED_IPS = [
+    network.strip() for network in env_vars.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if network.strip()
+]
+METRICS_TOKEN = env_vars.get('METRICS_TOKEN', '')
+METRICS_DIR = env_vars.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(env_vars.get('METRICS_FLUSH_INTERVAL', '5'))
+# ---------------
+
+# --- Fast-path list rendering ---
+# Product and review lists are rendered from .values() rows instead of
+# DRF serializers. The output is byte-identical; turn off to compare.
+FAST_LIST_RENDERING = env_vars.get('FAST_LIST_RENDERING', 'True') == 'True'
+
+# Maximum number of ids accepted by /api/products/batch/.
+PRODUCT_BATCH_MAX_IDS = 50
+
+# Autocomplete at /api/products/suggest/ (see products/suggest.py): at most
+# this many products are indexed per process, reloaded every TTL seconds.
+PRODUCT_SUGGEST_MAX_ENTRIES = 100000
+PRODUCT_SUGGEST_TTL = 300
+PRODUCT_SUGGEST_LIMIT = 10
+
+# Neighbours stored per product by `manage.py compute_similar_products`.
+SIMILAR_PRODUCTS_TOP_K = 10
+
+# Review keywords shown as facets on the product detail page.
+REVIEW_FACETS_LIMIT = 10
+
+# `manage.py archive_reviews` moves reviews older than this many days into the
+# compressed archive table, this many per transaction.
+REVIEW_ARCHIVE_AFTER_DAYS = int(env_vars.get('REVIEW_ARCHIVE_AFTER_DAYS', '365'))
+REVIEW_ARCHIVE_BATCH_SIZE = 500
+# --------------------------------
+
+# --- Bulk User Provisioning ---
+# Used by `manage.py provision_users` and /api/accounts/bulk-provision/.
+# PROVISIONING_PROCESSES=0 hashes passwords with one process per CPU.
+PROVISIONING_PROCESSES = int(env_vars.get('PROVISIONING_PROCESSES', '0')) or None
+PROVISIONING_CHUNK_SIZE = 500
+PROVISIONING_MAX_USERS = 5000
+# -------------------------------
+
+# --- Background Jobs ---
+# Processed by `python manage.py run_workers` (see core/jobs.py).
+JOBS_POLL_INTERVAL = float(env_vars.get('JOBS_POLL_INTERVAL', '1.0'))
+JOBS_LOCK_TIMEOUT = int(env_vars.get('JOBS_LOCK_TIMEOUT', '300'))
+JOBS_BACKOFF_BASE = 5
+JOBS_MAX_BACKOFF = 3600
+
+PRODUCT_THUMBNAIL_SIZE = 320
+# Longest side, in pixels, of the inline placeholder stored with each image.
+PRODUCT_PLACEHOLDER_SIZE = 16
+# Rows deleted per transaction when purging a deleted product.
+PRODUCT_PURGE_BATCH_SIZE = 500
+# -----------------------
+
+# --- Idempotency Keys ---
+# How long responses to requests with an Idempotency-Key header are kept,
+# and after how long an unfinished request with a key may be retried.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+# -------------------------
+
+# --- Changes Feed ---
+# Entries per page of /api/changes/; `manage.py compact_changes` drops
+# superseded entries older than CHANGES_RETENTION_DAYS.
+CHANGES_PAGE_SIZE = 500
+CHANGES_RETENTION_DAYS = 7
+# ----------------------
+
+# --- Server-Sent Events ---
+# Live review streams at /api/products/<id>/reviews/stream/ (see core/events.py).
+# The database backend delivers events published by job workers and other web
+# workers; 'core.events.LocalBackend' only suits a single process and
+# triggers the core.W003 system check warning.
+EVENTS_BACKEND = env_vars.get('EVENTS_BACKEND', 'core.events.DatabaseBackend')
+EVENTS_REPLAY_SIZE = 100
+EVENTS_RETENTION = 3600
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_HEARTBEAT = 15
+EVENTS_RETRY_MS = 3000
+# --------------------------
@@ -18,12 +18,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import ChangesView, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include([
         path('accounts/', include('accounts.urls')),
         path('products/', include('products.urls')),
+        path('changes/', ChangesView.as_view(), name='changes'),
     ])),
 ]
 
@@ -1,3 +1,48 @@
 from django.contrib import admin
+from core.admin import LargeTableAdmin
+from .models import Product, ProductImage
 
-# Register your models here.
+
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    fields = ['image', 'thumbnail']
+    extra = 0
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'price', 'review_count', 'average_rating_display', 'created_at', 'deleted_at']
+    list_display_links = ['id', 'name']
+    # '^' searches by name prefix, which can use the name index.
+    search_fields = ['^name', '=id']
+    list_filter = [('deleted_at', admin.EmptyFieldListFilter)]
+    readonly_fields = ['review_count', 'rating_sum', 'created_at', 'updated_at']
+    ordering = ['-id']
+    inlines = [ProductImageInline]
+
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        for product in queryset.filter(deleted_at__isnull=True):
+            product.soft_delete()
+
+    def get_deleted_objects(self, objs, request):
+        # Deleting only hides products (see Product.soft_delete()), so there is
+        # nothing to cascade to list, and listing every review would not scale.
+        deleted = [f'{Product._meta.verbose_name}: {obj}' for obj in objs]
+        return deleted, {Product._meta.verbose_name_plural: len(objs)}, set(), []
+
+    @admin.display(description='Average rating', ordering='rating_sum')
+    def average_rating_display(self, obj):
+        # From the stored aggregates; no query per row.
+        return round(obj.average_rating, 2)
+
+
+@admin.register(ProductImage)
+class ProductImageAdmin(LargeTableAdmin):
+    list_display = ['id', 'product', 'image', 'thumbnail']
+    list_select_related = ['product']
+    raw_id_fields = ['product']
+    search_fields = ['=product__id']
+    ordering = ['-id']
@@ -0,0 +1,28 @@
+import base64
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image
+
+
+def image_metadata(file):
+    """
+    Read an image file once and return the ``ProductImage`` metadata fields:
+    dimensions, format, byte size and a tiny base64 JPEG placeholder that
+    clients can show, blurred, until the real image has loaded.
+    """
+    file.seek(0)
+    with Image.open(file) as picture:
+        width, height, image_format = picture.width, picture.height, picture.format or ''
+        picture.draft('RGB', (settings.PRODUCT_PLACEHOLDER_SIZE * 4, settings.PRODUCT_PLACEHOLDER_SIZE * 4))
+        picture.thumbnail((settings.PRODUCT_PLACEHOLDER_SIZE, settings.PRODUCT_PLACEHOLDER_SIZE))
+        buffer = BytesIO()
+        picture.convert('RGB').save(buffer, format='JPEG', quality=50, optimize=True)
+    file.seek(0)
+    return {
+        'width': width,
+        'height': height,
+        'format': image_format,
+        'size': file.size,
+        'placeholder': 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
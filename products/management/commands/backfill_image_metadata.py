@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core import changes
+from core.caching import bump_versions
+from core.processes import setup_worker
+from products.imaging import image_metadata
+from products.models import ProductImage
+
+FIELDS = ['width', 'height', 'format', 'size', 'placeholder']
+
+
+def read_metadata(item):
+    """Runs in a worker process: returns ``(pk, metadata or error message)``."""
+    pk, name = item
+    try:
+        with default_storage.open(name, 'rb') as f:
+            return pk, image_metadata(f)
+    except Exception as e:
+        return pk, f'{type(e).__name__}: {e}'
+
+
+class Command(BaseCommand):
+    help = "Fill in dimensions, format, size and placeholder for images uploaded before they were stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes reading the image files.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Images saved per database update.')
+        parser.add_argument('--all', action='store_true', help='Recompute metadata for every image.')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by('pk')
+        if not options['all']:
+            images = images.filter(width__isnull=True)
+        product_ids = dict(images.values_list('pk', 'product_id'))
+        items = list(images.values_list('pk', 'image'))
+        if not items:
+            self.stdout.write("No images to process.")
+            return
+
+        # Workers must not share the parent's database connections.
+        connections.close_all()
+        done = failed = 0
+        batch = []
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=setup_worker) as pool:
+            for pk, result in pool.map(read_metadata, items, chunksize=8):
+                if isinstance(result, str):
+                    failed += 1
+                    self.stderr.write(f"Image {pk}: {result}")
+                    continue
+                batch.append(ProductImage(pk=pk, **result))
+                if len(batch) >= options['batch_size']:
+                    done += self.save(batch, product_ids)
+                    batch = []
+        done += self.save(batch, product_ids)
+        self.stdout.write(self.style.SUCCESS(f"Updated {done} image(s); {failed} could not be read."))
+
+    def save(self, batch, product_ids):
+        ProductImage.objects.bulk_update(batch, FIELDS)
+        # bulk_update() sends no signals; do what they would.
+        changes.record_many('product_image', [image.pk for image in batch])
+        bump_versions('products', *{f'product:{product_ids[image.pk]}' for image in batch})
+        return len(batch)
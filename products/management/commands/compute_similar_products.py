@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import SimilarProduct
+from products.similarity import rating_matrix, top_k_similar
+from reviews.models import ArchivedReview, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the 'similar products' table from item-item cosine similarity "
+        "of review ratings. Run it periodically, e.g. nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.SIMILAR_PRODUCTS_TOP_K,
+                            help='Neighbours stored per product.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Products whose similarities are computed (and written) at a time.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        tables = [
+            model.objects.filter(product__deleted_at__isnull=True) for model in (Review, ArchivedReview)
+        ]
+        columns = np.fromiter(
+            (value for reviews in tables
+             for review in reviews.values_list('product_id', 'user_id', 'rating').iterator(chunk_size=10000)
+             for value in review),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        count = len(columns)
+        # Products without any (visible) reviews keep no neighbours.
+        SimilarProduct.objects.exclude(product__in=tables[0].values('product_id')).exclude(
+            product__in=tables[1].values('product_id'),
+        ).delete()
+        if not count:
+            self.stdout.write("No reviews to compute similarities from.")
+            return
+        matrix, product_ids = rating_matrix(columns[:, 0], columns[:, 1], columns[:, 2])
+        self.stdout.write(f"Loaded {count} reviews of {len(product_ids)} products.")
+
+        written = 0
+        for start, stop, rows, cols, scores, ranks in top_k_similar(matrix, options['top_k'], options['chunk_size']):
+            with transaction.atomic():
+                SimilarProduct.objects.filter(product_id__in=product_ids[start:stop].tolist()).delete()
+                SimilarProduct.objects.bulk_create([
+                    SimilarProduct(product_id=product, similar_id=similar, score=score, rank=rank)
+                    for product, similar, score, rank in zip(
+                        product_ids[rows].tolist(), product_ids[cols].tolist(), scores.tolist(), ranks.tolist(),
+                    )
+                ], batch_size=1000)
+            written += len(rows)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} similarities in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:31
+
+import products.models
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_review_aggregates(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+    totals = Review.objects.values('product_id').annotate(count=Count('id'), total=Sum('rating'))
+    for row in totals.iterator():
+        Product.objects.filter(pk=row['product_id']).update(review_count=row['count'], rating_sum=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to=products.models.get_product_thumbnail_path),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
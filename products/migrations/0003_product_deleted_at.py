@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_review_aggregates_and_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,14 @@
-from django.db import models
-from django.db.models import Avg
+import uuid
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from core.jobs import enqueue
+
+class ProductQuerySet(models.QuerySet):
+    def visible(self):
+        """Products that have not been deleted (deleted ones wait for the purge job)."""
+        return self.filter(deleted_at__isnull=True)
 
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -7,20 +16,93 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Stored review aggregates, kept up to date by the 'products.refresh_aggregates' job.
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Set on delete; the 'products.purge' job removes the row and its reviews and images later.
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Product list ordering, and prefix search in the admin.
+            models.Index(fields=['name'], name='products_product_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     @property
     def average_rating(self):
-        return self.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0.0
+        return self.rating_sum / self.review_count if self.review_count else 0.0
+
+    @transaction.atomic
+    def soft_delete(self):
+        """
+        Hide the product now; its reviews, images and files are removed in
+        small batches by the 'products.purge' job.
+        """
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+        enqueue('products.purge', {'product_id': self.pk}, dedupe_key=f'purge:{self.pk}')
 
 def get_product_image_path(instance, filename):
     return f'products/{instance.product.id}/{filename}'
 
+def get_product_thumbnail_path(instance, filename):
+    return f'products/{instance.product.id}/thumbnails/{filename}'
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to=get_product_image_path)
+    # Generated in the background by the 'products.generate_thumbnail' job.
+    thumbnail = models.ImageField(upload_to=get_product_thumbnail_path, blank=True)
+    # Filled in at upload (or by `manage.py backfill_image_metadata`) so clients
+    # can lay out and preview images before downloading them.
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    format = models.CharField(max_length=10, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True)
 
     def __str__(self):
-        return f"Image for {self.product.name}"
\ No newline at end of file
+        return f"Image for {self.product.name}"
+
+class SimilarProduct(models.Model):
+    """
+    Precomputed "customers who reviewed this also liked" neighbours, written by
+    ``manage.py compute_similar_products``.
+    """
+    product = models.ForeignKey(Product, related_name='similar_products', on_delete=models.CASCADE)
+    similar = models.ForeignKey(Product, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='products_similar_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.similar_id} ({self.score:.3f})"
+
+
+class ImageUpload(models.Model):
+    """
+    An image upload in progress, sent in chunks (see products/uploads.py).
+    The received bytes live in a part file until the upload is complete.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, related_name='+', on_delete=models.CASCADE)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # SHA-256 of the whole file (hex), if the client sent one.
+    checksum = models.CharField(max_length=64, blank=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
@@ -1,17 +1,46 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Product, ProductImage
+from .models import ImageUpload, Product, ProductImage, SimilarProduct
 from reviews.serializers import ReviewSerializer
 
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'thumbnail', 'width', 'height', 'format', 'size', 'placeholder']
+        read_only_fields = ['width', 'height', 'format', 'size', 'placeholder']
+
+class ProductImageChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'product', 'image', 'thumbnail', 'width', 'height', 'format', 'size', 'placeholder']
 
 class ProductImageUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ['image']
 
+class ImageUploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'filename', 'size', 'checksum', 'offset', 'chunk_size', 'created_at']
+        read_only_fields = ['offset', 'created_at']
+
+    def get_chunk_size(self, obj):
+        return settings.CHUNKED_UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Images must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value)):
+            raise serializers.ValidationError("Must be the SHA-256 hex digest of the whole file.")
+        return value
+
 class ProductListSerializer(serializers.ModelSerializer):
     average_rating = serializers.FloatField(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
@@ -21,11 +50,43 @@ class ProductListSerializer(serializers.ModelSerializer):
         model = Product
         fields = ['id', 'url', 'name', 'price', 'average_rating', 'images']
 
+class ProductChangeSerializer(serializers.ModelSerializer):
+    average_rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'description', 'price', 'review_count', 'average_rating', 'updated_at']
+
 class ProductDetailSerializer(serializers.ModelSerializer):
-    reviews = ReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     average_rating = serializers.FloatField(read_only=True)
+    facets = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'average_rating', 'images', 'reviews']
\ No newline at end of file
+        fields = ['id', 'name', 'description', 'price', 'average_rating', 'facets', 'images', 'reviews']
+
+    def get_facets(self, obj):
+        """Most mentioned review keywords; filter reviews by one with ``?facet=``."""
+        top = obj.facets.filter(count__gt=0).order_by('-count', 'term')[:settings.REVIEW_FACETS_LIMIT]
+        return [{'term': term, 'count': count} for term, count in top.values_list('term', 'count')]
+
+    def get_reviews(self, obj):
+        """All reviews, archived ones included, oldest first like the unpaged review list."""
+        reviews = [
+            *obj.archived_reviews.select_related('user').order_by('created_at', 'id'),
+            *obj.reviews.select_related('user').order_by('created_at', 'id'),
+        ]
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+
+class SimilarProductSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='similar.id', read_only=True)
+    url = serializers.HyperlinkedRelatedField(source='similar', view_name='product-detail', read_only=True)
+    name = serializers.CharField(source='similar.name', read_only=True)
+    price = serializers.DecimalField(source='similar.price', max_digits=10, decimal_places=2, read_only=True)
+    average_rating = serializers.FloatField(source='similar.average_rating', read_only=True)
+
+    class Meta:
+        model = SimilarProduct
+        fields = ['id', 'url', 'name', 'price', 'average_rating', 'score']
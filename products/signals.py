@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import changes
+from core.caching import bump_versions
+from core.models import ChangeLogEntry
+from .models import Product, ProductImage
+from .serializers import ProductChangeSerializer, ProductImageChangeSerializer
+from .suggest import suggest_index
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_responses(sender, instance, **kwargs):
+    bump_versions('products', f'product:{instance.pk}')
+
+
+@receiver(post_save, sender=Product)
+def update_suggest_index(sender, instance, **kwargs):
+    if instance.deleted_at is not None:
+        transaction.on_commit(lambda: suggest_index.remove(instance.pk))
+    else:
+        pk, name, popularity = instance.pk, instance.name, instance.review_count
+        transaction.on_commit(lambda: suggest_index.upsert(pk, name, popularity))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_suggest_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: suggest_index.remove(pk))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_image_responses(sender, instance, **kwargs):
+    bump_versions('products', f'product:{instance.product_id}')
+
+
+changes.register('product', lambda ids: Product.objects.visible().filter(pk__in=ids), ProductChangeSerializer)
+changes.register(
+    'product_image',
+    lambda ids: ProductImage.objects.filter(pk__in=ids, product__deleted_at__isnull=True),
+    ProductImageChangeSerializer,
+)
+
+
+@receiver(post_save, sender=Product)
+def log_product_change(sender, instance, **kwargs):
+    action = ChangeLogEntry.DELETE if instance.deleted_at is not None else ChangeLogEntry.UPSERT
+    changes.record('product', instance.pk, action)
+
+
+@receiver(post_save, sender=ProductImage)
+def log_product_image_change(sender, instance, **kwargs):
+    changes.record('product_image', instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def log_product_delete(sender, instance, **kwargs):
+    changes.record('product', instance.pk, ChangeLogEntry.DELETE)
+
+
+@receiver(post_delete, sender=ProductImage)
+def log_product_image_delete(sender, instance, **kwargs):
+    changes.record('product_image', instance.pk, ChangeLogEntry.DELETE)
@@ -0,0 +1,50 @@
+"""
+Item-item cosine similarity over the product x user rating matrix.
+
+Used by ``manage.py compute_similar_products``. The matrix is built as a
+SciPy sparse matrix with L2-normalized rows, so the similarities of a chunk
+of products with every other product are one sparse matrix product; the
+top K of each row are then picked without a Python loop per product.
+"""
+import numpy as np
+from scipy import sparse
+
+
+def rating_matrix(product_ids, user_ids, ratings):
+    """
+    Build the row-normalized product x user matrix from parallel arrays of
+    reviews. Returns ``(matrix, products)`` where ``products[i]`` is the
+    product id of row ``i``.
+    """
+    products, rows = np.unique(np.asarray(product_ids, dtype=np.int64), return_inverse=True)
+    _, cols = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.asarray(ratings, dtype=np.float32), (rows, cols)),
+        shape=(len(products), cols.max() + 1 if len(cols) else 0),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(matrix).tocsr(), products
+
+
+def top_k_similar(matrix, top_k, chunk_size):
+    """
+    For each chunk of rows of ``matrix``, yield ``(start, stop, rows,
+    neighbours, scores, ranks)``: the ``top_k`` most similar other rows of
+    every row in ``range(start, stop)``, as parallel arrays.
+    """
+    transposed = matrix.T.tocsc()
+    for start in range(0, matrix.shape[0], chunk_size):
+        stop = min(start + chunk_size, matrix.shape[0])
+        chunk = (matrix[start:stop] @ transposed).tocoo()
+        rows = chunk.row.astype(np.int64) + start
+        keep = (chunk.col != rows) & (chunk.data > 0)
+        rows, cols, scores = rows[keep], chunk.col[keep], chunk.data[keep]
+
+        # Sort by row, then by descending score (ties by neighbour for stable output).
+        order = np.lexsort((cols, -scores, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        first = np.searchsorted(rows, rows, side='left')
+        ranks = np.arange(len(rows)) - first
+        keep = ranks < top_k
+        yield start, stop, rows[keep], cols[keep], scores[keep], ranks[keep]
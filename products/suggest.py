@@ -0,0 +1,143 @@
+"""
+In-memory prefix index for product name autocompletion.
+
+Each process loads the index lazily on the first suggestion request: the
+``PRODUCT_SUGGEST_MAX_ENTRIES`` most reviewed visible products, as a sorted
+list of ``(normalized name, id)`` pairs. A prefix is answered with two binary
+searches and a top-N pick by popularity (review count), so no query hits the
+database. Product saves and deletes in this process update the index after
+commit; changes made by other processes (and new review counts) are picked
+up by a full reload every ``PRODUCT_SUGGEST_TTL`` seconds. The reload runs in
+a background thread, one at a time, while requests keep being answered from
+the previous index; only the very first load makes requests wait.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for every string starting with a given prefix.
+_MAX_CHAR = chr(0x10FFFF)
+# Prefixes matching more names than this have their top results memoized.
+_SCAN_LIMIT = 500
+_MEMO_SIZE = 1000
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held while the rows are read, so only one load runs at a time.
+        self._load_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._entries = {}
+            self._memo = {}
+            self._loaded_at = None
+            self._refreshing = False
+
+    def _load(self):
+        from .models import Product
+        rows = (
+            Product.objects.visible().order_by('-review_count', 'id')
+            .values_list('id', 'name', 'review_count')[:settings.PRODUCT_SUGGEST_MAX_ENTRIES]
+        )
+        entries = {pk: (normalize(name), name, popularity) for pk, name, popularity in rows}
+        keys = sorted((key, pk) for pk, (key, _, _) in entries.items())
+        with self._lock:
+            self._entries, self._keys, self._memo = entries, keys, {}
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            # Nothing to answer from yet: one request loads, the others wait for it.
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self._load()
+            return
+        with self._lock:
+            stale = not self._refreshing and time.monotonic() - self._loaded_at > settings.PRODUCT_SUGGEST_TTL
+            if stale:
+                self._refreshing = True
+        if stale:
+            threading.Thread(target=self._refresh, name='suggest-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._load_lock:
+                self._load()
+        except Exception:
+            logger.exception("Reloading the suggest index failed; serving the previous one.")
+        finally:
+            with self._lock:
+                self._refreshing = False
+            # This thread's own database connection.
+            connection.close()
+
+    def suggest(self, prefix, limit):
+        """Return up to ``limit`` ``(id, name)`` pairs whose name starts with ``prefix``."""
+        self._ensure_loaded()
+        prefix = normalize(prefix)
+        with self._lock:
+            memo = self._memo.get(prefix)
+            if memo is not None and len(memo) >= limit:
+                return memo[:limit]
+            lo = bisect_left(self._keys, (prefix,))
+            hi = bisect_left(self._keys, (prefix + _MAX_CHAR,), lo)
+            entries = self._entries
+            top = heapq.nsmallest(
+                max(limit, settings.PRODUCT_SUGGEST_LIMIT) if hi - lo > _SCAN_LIMIT else limit,
+                (pk for _, pk in self._keys[lo:hi]),
+                key=lambda pk: (-entries[pk][2], entries[pk][0], pk),
+            )
+            result = [(pk, entries[pk][1]) for pk in top]
+            if hi - lo > _SCAN_LIMIT:
+                if len(self._memo) >= _MEMO_SIZE:
+                    self._memo.clear()
+                self._memo[prefix] = result
+            return result[:limit]
+
+    def upsert(self, pk, name, popularity):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            old = self._entries.get(pk)
+            if old is None and len(self._entries) >= settings.PRODUCT_SUGGEST_MAX_ENTRIES:
+                # Full; the next reload keeps the most popular products.
+                return
+            if old is not None:
+                self._discard(pk, old[0])
+            key = normalize(name)
+            self._entries[pk] = (key, name, popularity)
+            insort(self._keys, (key, pk))
+            self._memo.clear()
+
+    def remove(self, pk):
+        with self._lock:
+            old = self._entries.pop(pk, None)
+            if old is not None:
+                self._discard(pk, old[0])
+                self._memo.clear()
+
+    def _discard(self, pk, key):
+        index = bisect_left(self._keys, (key, pk))
+        if index < len(self._keys) and self._keys[index] == (key, pk):
+            del self._keys[index]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+suggest_index = SuggestIndex()
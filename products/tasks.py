@@ -0,0 +1,92 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from PIL import Image
+from core import changes
+from core.caching import bump_versions
+from core.events import publish
+from core.jobs import enqueue, job
+from reviews.models import ArchivedReview, ProductFacet, Review
+from .models import Product, ProductImage
+
+
+@job('products.refresh_aggregates', batch_size=100)
+def refresh_aggregates(payloads):
+    """Recompute the stored review count and rating sum of each product, archived reviews included."""
+    product_ids = {payload['product_id'] for payload in payloads}
+    review_count, rating_sum = Value(0), Value(0)
+    for model in (Review, ArchivedReview):
+        reviews = model.objects.filter(product=OuterRef('pk')).values('product')
+        review_count += Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n')), Value(0))
+        rating_sum += Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), Value(0))
+    Product.objects.filter(pk__in=product_ids).update(review_count=review_count, rating_sum=rating_sum)
+    bump_versions('products', *(f'product:{pk}' for pk in product_ids))
+    # update() skips signals; the new average is a change feed clients want.
+    changes.record_many('product', sorted(product_ids))
+    for product in Product.objects.filter(pk__in=product_ids).only('review_count', 'rating_sum'):
+        publish(f'product:{product.pk}', 'aggregate', {
+            'review_count': product.review_count,
+            'average_rating': product.average_rating,
+        })
+
+
+@job('products.generate_thumbnail', max_attempts=3)
+def generate_thumbnail(payloads):
+    for payload in payloads:
+        try:
+            product_image = ProductImage.objects.select_related('product').get(pk=payload['image_id'])
+        except ProductImage.DoesNotExist:
+            continue
+        with product_image.image.open('rb') as source, Image.open(source) as picture:
+            picture.thumbnail((settings.PRODUCT_THUMBNAIL_SIZE, settings.PRODUCT_THUMBNAIL_SIZE))
+            buffer = BytesIO()
+            picture.convert('RGB').save(buffer, format='JPEG', quality=85)
+        name = PurePosixPath(product_image.image.name).stem + '.jpg'
+        product_image.thumbnail.save(name, ContentFile(buffer.getvalue()), save=False)
+        product_image.save(update_fields=['thumbnail'])
+
+
+@job('products.delete_files', batch_size=50)
+def delete_files(payloads):
+    """Remove media files left behind by deleted images and products."""
+    for payload in payloads:
+        for name in payload['names']:
+            default_storage.delete(name)
+
+
+@job('products.purge')
+def purge(payloads):
+    """
+    Remove soft-deleted products with their reviews, facets and images, a few
+    hundred rows per transaction so the database is never locked for long.
+    """
+    batch_size = settings.PRODUCT_PURGE_BATCH_SIZE
+    for payload in payloads:
+        product_id = payload['product_id']
+        if not Product.objects.filter(pk=product_id, deleted_at__isnull=False).exists():
+            continue
+        # Facets too: a popular product can have a great many, and the final
+        # product delete would otherwise cascade to all of them at once.
+        for model in (Review, ArchivedReview, ProductFacet):
+            while True:
+                with transaction.atomic():
+                    batch = list(model.objects.filter(product_id=product_id).values_list('pk', flat=True)[:batch_size])
+                    model.objects.filter(pk__in=batch).delete()
+                if len(batch) < batch_size:
+                    break
+        while True:
+            with transaction.atomic():
+                batch = list(ProductImage.objects.filter(product_id=product_id)[:batch_size])
+                names = [name for image in batch for name in (image.image.name, image.thumbnail.name) if name]
+                ProductImage.objects.filter(pk__in=[image.pk for image in batch]).delete()
+                if names:
+                    enqueue('products.delete_files', {'names': names})
+            if len(batch) < batch_size:
+                break
+        Product.objects.filter(pk=product_id).delete()
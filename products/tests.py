@@ -1,11 +1,26 @@
 
+import gzip
+import hashlib
+import json
+import os
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
-from .models import Product, ProductImage
+from core.jobs import run_pending_jobs
+from core.models import Job
+from reviews.models import ProductFacet, Review
+from .models import Product, ProductImage, SimilarProduct
+from .suggest import suggest_index
 
 # This is the byte data for a tiny, valid 1x1 pixel GIF.
 # We use this to satisfy the ImageField's validation that the uploaded file is a real image.
@@ -75,8 +90,40 @@ class ProductTests(APITestCase):
         url = reverse('product-detail', kwargs={'pk': self.product.pk})
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Product.objects.visible().count(), 0)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        run_pending_jobs()
         self.assertEqual(Product.objects.count(), 0)
 
+    def test_deleted_product_is_purged_in_batches(self):
+        """
+        Ensure deletion hides the product at once and the purge job removes its rows.
+        """
+        for i in range(5):
+            user = User.objects.create_user(username=f'reviewer{i}', password='password123')
+            Review.objects.create(product=self.product, user=user, rating=4, feedback='Fine.')
+            ProductFacet.objects.create(product=self.product, term=f'term {i}', count=1)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        self.client.delete(reverse('product-detail', kwargs={'pk': self.product.pk}))
+
+        self.assertEqual(Review.objects.count(), 5)
+        self.assertEqual(json.loads(self.client.get(reverse('product-list-create')).content), [])
+        reviews_url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+        self.assertEqual(json.loads(self.client.get(reviews_url).content), [])
+
+        with self.settings(PRODUCT_PURGE_BATCH_SIZE=2), CaptureQueriesContext(connection) as queries:
+            run_pending_jobs()
+        self.assertFalse(Product.objects.filter(pk=self.product.pk).exists())
+        self.assertEqual(Review.objects.count(), 0)
+        self.assertEqual(ProductFacet.objects.count(), 0)
+        # Facets go a batch at a time, not in the product delete's cascade.
+        facet_batches = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('DELETE FROM "reviews_productfacet" WHERE "reviews_productfacet"."id" IN')
+        ]
+        self.assertEqual(len(facet_batches), 3)
+
     # --- Image Upload Tests ---
     
     def test_admin_can_upload_image_for_product(self):
@@ -96,6 +143,78 @@ class ProductTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(ProductImage.objects.count(), 1)
         self.assertEqual(ProductImage.objects.first().product, self.product)
+
+    def test_image_metadata_is_stored_at_upload(self):
+        """
+        Ensure dimensions, format, size and a placeholder are saved with the upload and listed.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        url = reverse('product-image-upload', kwargs={'product_id': self.product.pk})
+        image = SimpleUploadedFile("meta.gif", MINIMAL_GIF_BYTES, content_type="image/gif")
+        self.client.post(url, {'image': image}, format='multipart')
+        self.client.credentials()
+
+        product_image = ProductImage.objects.get()
+        self.assertEqual((product_image.width, product_image.height), (1, 1))
+        self.assertEqual(product_image.format, 'GIF')
+        self.assertEqual(product_image.size, len(MINIMAL_GIF_BYTES))
+        self.assertTrue(product_image.placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertEqual(product_image.image.read(), MINIMAL_GIF_BYTES)
+
+        listed = json.loads(self.client.get(reverse('product-list-create')).content)[0]['images'][0]
+        self.assertEqual(listed['width'], 1)
+        self.assertEqual(listed['placeholder'], product_image.placeholder)
+
+    def test_backfill_command_fills_missing_image_metadata(self):
+        """
+        Ensure existing images without metadata are processed by the backfill command.
+        """
+        product_image = ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile("old.gif", MINIMAL_GIF_BYTES, content_type="image/gif"),
+        )
+        self.assertIsNone(product_image.width)
+
+        call_command('backfill_image_metadata', processes=2, stdout=StringIO())
+        product_image.refresh_from_db()
+        self.assertEqual((product_image.width, product_image.format), (1, 'GIF'))
+        self.assertTrue(product_image.placeholder)
+
+    def test_thumbnail_is_generated_in_background(self):
+        """
+        Ensure an upload returns before the thumbnail exists and a worker creates it.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        url = reverse('product-image-upload', kwargs={'product_id': self.product.pk})
+        image = SimpleUploadedFile("thumb_me.gif", MINIMAL_GIF_BYTES, content_type="image/gif")
+        response = self.client.post(url, {'image': image}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        product_image = ProductImage.objects.get()
+        self.assertFalse(product_image.thumbnail)
+        self.assertTrue(Job.objects.filter(name='products.generate_thumbnail').exists())
+
+        run_pending_jobs()
+        product_image.refresh_from_db()
+        self.assertTrue(product_image.thumbnail.name.endswith('thumb_me.jpg'))
+        self.assertTrue(product_image.thumbnail.storage.exists(product_image.thumbnail.name))
+
+    def test_deleting_product_removes_image_files_in_background(self):
+        """
+        Ensure the image files of a deleted product are cleaned up by a worker.
+        """
+        product_image = ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile("orphan.gif", MINIMAL_GIF_BYTES, content_type="image/gif"),
+        )
+        storage, name = product_image.image.storage, product_image.image.name
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.delete(reverse('product-detail', kwargs={'pk': self.product.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(storage.exists(name))
+
+        run_pending_jobs()
+        self.assertFalse(storage.exists(name))
         
     def test_regular_user_cannot_upload_image(self):
         """
@@ -108,4 +227,372 @@ class ProductTests(APITestCase):
         data = {'image': image}
         response = self.client.post(url, data, format='multipart')
 
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # --- Fast-path List Rendering Tests ---
+
+    def test_fast_product_list_matches_serializer_output(self):
+        """
+        Ensure the fast-path product list is byte-identical to the serializer output.
+        """
+        other = Product.objects.create(name='Ergonomic Mouse   é', description='A mouse.', price='1234.5')
+        ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile("fast path.gif", MINIMAL_GIF_BYTES, content_type="image/gif"),
+        )
+        Review.objects.create(product=other, user=self.regular_user, rating=4, feedback='Nice.')
+        Review.objects.create(product=other, user=self.admin_user, rating=5, feedback='Great.')
+        run_pending_jobs()
+        Product.objects.filter(pk=other.pk).update(review_count=2, rating_sum=9)
+        url = reverse('product-list-create')
+
+        with self.settings(FAST_LIST_RENDERING=False, RESPONSE_CACHE_ENABLED=False):
+            slow_response = self.client.get(url)
+        with self.settings(RESPONSE_CACHE_ENABLED=False), self.assertNumQueries(2):
+            fast_response = self.client.get(url)
+
+        self.assertEqual(fast_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast_response['Content-Type'], slow_response['Content-Type'])
+        self.assertEqual(fast_response.content, slow_response.content)
+
+    def test_admin_delete_is_a_soft_delete(self):
+        """
+        Ensure deleting from the admin hides products and leaves the rest to the purge job.
+        """
+        reviewer = User.objects.create_user(username='reviewer', password='password123')
+        Review.objects.create(product=self.product, user=reviewer, rating=4, feedback='Fine.')
+        other = Product.objects.create(name='Mouse', description='A mouse.', price='19.99')
+        self.client.force_login(self.admin_user)
+
+        url = reverse('admin:products_product_delete', args=[self.product.pk])
+        confirm = self.client.get(url)
+        self.assertNotContains(confirm, 'Fine.')
+        self.assertNotContains(confirm, 'Review by')
+        self.client.post(url, {'post': 'yes'})
+        self.client.post(reverse('admin:products_product_changelist'), {
+            'action': 'delete_selected', '_selected_action': [other.pk], 'post': 'yes',
+        })
+
+        self.assertEqual(Product.objects.visible().count(), 0)
+        self.assertEqual(Review.objects.count(), 1)
+        self.assertEqual(Job.objects.filter(name='products.purge').count(), 2)
+        run_pending_jobs()
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Review.objects.exists())
+
+    # --- Response Cache Tests ---
+
+    def test_product_detail_is_served_from_cache_until_updated(self):
+        """
+        Ensure repeated reads hit the cache and a write invalidates it.
+        """
+        url = reverse('product-detail', kwargs={'pk': self.product.pk})
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        self.client.patch(url, {'name': 'Renamed Keyboard'}, format='json')
+        self.client.credentials()
+        response = self.client.get(url)
+        self.assertEqual(json.loads(response.content)['name'], 'Renamed Keyboard')
+
+    def test_cached_list_is_served_precompressed(self):
+        """
+        Ensure clients accepting gzip get the stored gzip variant.
+        """
+        for i in range(10):
+            Product.objects.create(name=f'Cable {i}', description='A cable.', price='5.00')
+        url = reverse('product-list-create')
+        plain = self.client.get(url)
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+    def test_stale_copy_is_served_while_another_request_rebuilds(self):
+        """
+        Ensure an outdated entry is served, without queries, while its rebuild is claimed elsewhere.
+        """
+        url = reverse('product-detail', kwargs={'pk': self.product.pk})
+        first = self.client.get(url)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        self.client.patch(url, {'name': 'Renamed Keyboard'}, format='json')
+        self.client.credentials()
+
+        with mock.patch('core.caching.acquire_refresh', return_value=None), self.assertNumQueries(0):
+            stale = self.client.get(url)
+        self.assertEqual(stale.content, first.content)
+
+        fresh = self.client.get(url)
+        self.assertEqual(json.loads(fresh.content)['name'], 'Renamed Keyboard')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, fresh.content)
+
+    def test_expired_entry_is_rebuilt(self):
+        """
+        Ensure an entry past RESPONSE_CACHE_TIMEOUT is rebuilt by the next request.
+        """
+        url = reverse('product-detail', kwargs={'pk': self.product.pk})
+        with self.settings(RESPONSE_CACHE_TIMEOUT=0):
+            self.client.get(url)
+            Product.objects.filter(pk=self.product.pk).update(name='Quietly Renamed')
+            response = self.client.get(url)
+        self.assertEqual(json.loads(response.content)['name'], 'Quietly Renamed')
+
+    # --- Batch Fetch Tests ---
+
+    def test_batch_returns_products_in_requested_order(self):
+        """
+        Ensure the batch endpoint keeps the requested order and reports missing ids.
+        """
+        other = Product.objects.create(name='Mouse', description='A mouse.', price='19.99', review_count=2, rating_sum=7)
+        for product in (self.product, other):
+            ProductImage.objects.create(
+                product=product, image=SimpleUploadedFile("batch.gif", MINIMAL_GIF_BYTES, content_type="image/gif"),
+            )
+        url = reverse('product-batch')
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'ids': f'{other.pk},9999,{self.product.pk},{other.pk}'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [other.pk, self.product.pk])
+        self.assertEqual(response.data['missing'], [9999])
+        self.assertEqual(response.data['results'][0]['average_rating'], 3.5)
+        self.assertEqual(len(response.data['results'][1]['images']), 1)
+
+    def test_batch_rejects_invalid_or_too_many_ids(self):
+        """
+        Ensure malformed and oversized id lists are rejected.
+        """
+        url = reverse('product-batch')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'ids': '1,abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(PRODUCT_BATCH_MAX_IDS=3):
+            response = self.client.get(url, {'ids': '1,2,3,4'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # --- Autocomplete Tests ---
+
+    def test_suggest_ranks_completions_by_popularity(self):
+        """
+        Ensure suggestions match the name prefix case-insensitively, most reviewed first.
+        """
+        suggest_index.clear()
+        Product.objects.create(name='Mechanical Pencil', description='A pencil.', price='2.00', review_count=1)
+        popular = Product.objects.create(name='mechanical watch', description='A watch.', price='200.00', review_count=9)
+        Product.objects.create(name='Mouse', description='A mouse.', price='19.99', review_count=50)
+        url = reverse('product-suggest')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'prefix': 'MECH'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'prefix': 'mo'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data], ['mechanical watch', 'Mechanical Pencil'])
+        self.assertEqual(response.data[0]['id'], popular.pk)
+        self.assertEqual(len(self.client.get(url, {'prefix': 'mech', 'limit': 1}).data), 1)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_suggest_index_follows_product_changes(self):
+        """
+        Ensure creates, renames and deletes update a loaded index without a reload.
+        """
+        suggest_index.clear()
+        url = reverse('product-suggest')
+        self.client.get(url, {'prefix': 'test'})
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('product-list-create'), {'name': 'Tenkeyless Board', 'description': 'x', 'price': '80.00'})
+            self.client.patch(reverse('product-detail', kwargs={'pk': self.product.pk}), {'name': 'Tactile Keyboard'})
+            self.client.delete(reverse('product-detail', kwargs={'pk': self.product.pk}))
+        self.client.credentials()
+        with self.assertNumQueries(0):
+            names = [item['name'] for item in self.client.get(url, {'prefix': 't'}).data]
+        self.assertEqual(names, ['Tenkeyless Board'])
+
+    def test_stale_suggest_index_reloads_in_the_background(self):
+        """
+        Ensure an expired index keeps answering while a single background reload runs.
+        """
+        from unittest import mock
+
+        suggest_index.clear()
+        url = reverse('product-suggest')
+        self.client.get(url, {'prefix': 'test'})
+        Product.objects.filter(pk=self.product.pk).update(name='Tactile Keyboard')
+
+        with self.settings(PRODUCT_SUGGEST_TTL=-1), mock.patch('products.suggest.threading.Thread') as thread:
+            with self.assertNumQueries(0):
+                self.assertEqual(len(self.client.get(url, {'prefix': 'test'}).data), 1)
+                self.client.get(url, {'prefix': 'test'})
+            self.assertEqual(thread.call_count, 1)
+
+            with mock.patch('products.suggest.connection'):
+                thread.call_args.kwargs['target']()
+            self.assertEqual(self.client.get(url, {'prefix': 'test'}).data, [])
+            self.assertEqual(thread.call_count, 2)
+        self.assertEqual(self.client.get(url, {'prefix': 'tact'}).data[0]['id'], self.product.pk)
+
+    # --- Similar Products Tests ---
+
+    def test_similar_products_are_computed_from_co_reviews(self):
+        """
+        Ensure the command ranks products by cosine similarity of their ratings.
+        """
+        close = Product.objects.create(name='Wrist Rest', description='A rest.', price='15.00')
+        far = Product.objects.create(name='Desk Lamp', description='A lamp.', price='30.00')
+        unrelated = Product.objects.create(name='Tea', description='Some tea.', price='5.00')
+        users = [User.objects.create_user(username=f'shopper{i}', password='password123') for i in range(4)]
+        for user in users[:3]:
+            Review.objects.create(product=self.product, user=user, rating=5, feedback='Good.')
+            Review.objects.create(product=close, user=user, rating=5, feedback='Good.')
+        Review.objects.create(product=far, user=users[0], rating=2, feedback='Meh.')
+        Review.objects.create(product=unrelated, user=users[3], rating=4, feedback='Fine.')
+
+        call_command('compute_similar_products', chunk_size=2, stdout=StringIO())
+        url = reverse('product-similar', kwargs={'pk': self.product.pk})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [close.pk, far.pk])
+        self.assertAlmostEqual(response.data[0]['score'], 1.0, places=5)
+        self.assertFalse(SimilarProduct.objects.filter(product=unrelated).exists())
+
+        Review.objects.filter(product=far).delete()
+        call_command('compute_similar_products', stdout=StringIO())
+        self.assertFalse(SimilarProduct.objects.filter(product=far).exists())
+        self.assertEqual([item['id'] for item in self.client.get(url).data], [close.pk])
+
+    def test_similar_products_for_missing_product(self):
+        """
+        Ensure asking for neighbours of a non-existent product returns 404.
+        """
+        response = self.client.get(reverse('product-similar', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # --- Chunked Upload Tests ---
+
+    def send_chunk(self, upload_id, data, offset, checksum=None):
+        return self.client.patch(
+            reverse('image-upload-detail', kwargs={'pk': upload_id}), data,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_UPLOAD_CHECKSUM='sha256=' + (checksum or hashlib.sha256(data).hexdigest()),
+        )
+
+    def start_upload(self, data, filename='chunked.gif'):
+        response = self.client.post(
+            reverse('image-upload-create', kwargs={'product_id': self.product.pk}),
+            {'filename': filename, 'size': len(data), 'checksum': hashlib.sha256(data).hexdigest()},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    @override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=20)
+    def test_chunked_upload_resumes_and_creates_image(self):
+        """
+        Ensure chunks are verified, can be resumed from the reported offset, and complete into an image.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        data = MINIMAL_GIF_BYTES
+        upload_id = self.start_upload(data)
+
+        self.assertEqual(self.send_chunk(upload_id, data[:20], 0).data['offset'], 20)
+        # A corrupted chunk and a chunk at the wrong offset are refused without losing progress.
+        bad = self.send_chunk(upload_id, b'x' * 20, 20, checksum=hashlib.sha256(data[20:40]).hexdigest())
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.send_chunk(upload_id, data[:20], 0).status_code, status.HTTP_409_CONFLICT)
+
+        status_response = self.client.get(reverse('image-upload-detail', kwargs={'pk': upload_id}))
+        self.assertEqual(status_response.data['offset'], 20)
+        self.assertEqual(ProductImage.objects.count(), 0)
+
+        self.send_chunk(upload_id, data[20:40], 20)
+        response = self.send_chunk(upload_id, data[40:], 40)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        product_image = ProductImage.objects.get(pk=response.data['id'])
+        self.assertEqual(product_image.product, self.product)
+        self.assertEqual(product_image.image.read(), data)
+        self.assertEqual(product_image.width, 1)
+        self.assertEqual(self.client.get(reverse('image-upload-detail', kwargs={'pk': upload_id})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=20)
+    def test_concurrent_retry_does_not_share_scratch_file(self):
+        """
+        Ensure a chunk request never writes to or removes another request's scratch file.
+        """
+        from .models import ImageUpload
+        from .uploads import _directory
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        data = MINIMAL_GIF_BYTES
+        upload_id = self.start_upload(data)
+        # The scratch file of a retry of the same chunk that is still streaming.
+        in_flight = os.path.join(_directory(), f'{upload_id}.retry.chunk')
+        with open(in_flight, 'wb') as f:
+            f.write(data[:10])
+
+        self.assertEqual(self.send_chunk(upload_id, data[:20], 0).data['offset'], 20)
+        self.assertEqual(self.send_chunk(upload_id, data[:20], 0).status_code, status.HTTP_409_CONFLICT)
+        with open(in_flight, 'rb') as f:
+            self.assertEqual(f.read(), data[:10])
+
+        self.client.delete(reverse('image-upload-detail', kwargs={'pk': upload_id}))
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(in_flight))
+
+    @override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=20)
+    def test_offset_only_moves_once_the_chunk_is_on_disk(self):
+        """
+        Ensure a chunk whose write fails leaves the offset alone, and its retry overwrites the partial write.
+        """
+        from unittest import mock
+        from .uploads import part_path
+        from .models import ImageUpload
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        data = MINIMAL_GIF_BYTES
+        upload_id = self.start_upload(data)
+        self.send_chunk(upload_id, data[:20], 0)
+
+        with mock.patch('products.uploads.os.fsync', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.send_chunk(upload_id, data[20:40], 20)
+        self.assertEqual(self.client.get(reverse('image-upload-detail', kwargs={'pk': upload_id})).data['offset'], 20)
+        # Bytes written past the offset by the failed request.
+        self.assertEqual(os.path.getsize(part_path(ImageUpload.objects.get())), 40)
+
+        self.assertEqual(self.send_chunk(upload_id, data[20:40], 20).data['offset'], 40)
+        response = self.send_chunk(upload_id, data[40:], 40)
+        self.assertEqual(ProductImage.objects.get(pk=response.data['id']).image.read(), data)
+
+    def test_chunked_upload_rejects_non_images(self):
+        """
+        Ensure a completed upload that is not an image is discarded.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        data = b'definitely not an image'
+        upload_id = self.start_upload(data, filename='fake.gif')
+        response = self.send_chunk(upload_id, data, 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ProductImage.objects.count(), 0)
+
+    def test_regular_user_cannot_start_chunked_upload(self):
+        """
+        Ensure only admins can upload images in chunks.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user_token.key)
+        response = self.client.post(
+            reverse('image-upload-create', kwargs={'product_id': self.product.pk}),
+            {'filename': 'x.gif', 'size': 10}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
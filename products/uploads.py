@@ -0,0 +1,172 @@
+"""
+Resumable, chunked image uploads.
+
+1. ``POST /api/products/<id>/uploads/`` with ``filename``, ``size`` and
+   optionally ``checksum`` (SHA-256 hex of the whole file) starts an upload.
+2. Each chunk is sent as the raw body of ``PATCH /api/products/uploads/<uuid>/``
+   with an ``Upload-Offset`` header (where the chunk starts) and an
+   ``Upload-Checksum: sha256=<hex>`` header. Chunks are streamed to a temporary
+   file in small pieces, so memory use does not depend on the chunk size. A
+   verified chunk is appended under a lock on the upload's part file, and the
+   offset only moves once it is on disk.
+3. After an interruption, ``GET`` the upload to learn the offset to resume at.
+
+When the last chunk arrives, the file is checked against the whole-file
+checksum, validated as an image and attached to a new ``ProductImage``.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from core.jobs import enqueue
+from .imaging import image_metadata
+from .models import ImageUpload, ProductImage
+
+READ_SIZE = 64 * 1024
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Upload-Offset does not match the upload's current offset."
+    default_code = 'conflict'
+
+
+def _directory():
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    return settings.CHUNKED_UPLOAD_DIR
+
+
+def part_path(upload):
+    return os.path.join(_directory(), f'{upload.pk}.part')
+
+
+def discard(upload):
+    """Delete an upload and whatever has been received for it."""
+    for path in [part_path(upload), *glob.glob(os.path.join(_directory(), f'{upload.pk}.*.chunk'))]:
+        _remove(path)
+    upload.delete()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def expire_uploads():
+    """Discard uploads that were started more than ``CHUNKED_UPLOAD_EXPIRY`` seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+    for upload in ImageUpload.objects.filter(created_at__lt=cutoff):
+        discard(upload)
+
+
+def parse_checksum(header):
+    algorithm, _, digest = (header or '').partition('=')
+    if algorithm.strip().lower() != 'sha256' or len(digest.strip()) != 64:
+        raise ValidationError({'Upload-Checksum': "Send the chunk's SHA-256 as 'sha256=<hex digest>'."})
+    return digest.strip().lower()
+
+
+def receive_chunk(upload, stream, offset, length, checksum):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``. Returns the
+    finished ``ProductImage`` if this was the last chunk, else ``None``.
+    """
+    if offset != upload.offset:
+        raise UploadConflict(f"Expected Upload-Offset {upload.offset}.")
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise ValidationError(f"Chunks must be between 1 and {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes.")
+    if offset + length > upload.size:
+        raise ValidationError("The chunk extends past the declared upload size.")
+
+    # Stream into a side file of this request's own first, so a broken or
+    # corrupt chunk (or a retry of it arriving concurrently) never touches
+    # the bytes already received.
+    fd, chunk_path = tempfile.mkstemp(prefix=f'{upload.pk}.', suffix='.chunk', dir=_directory())
+    digest = hashlib.sha256()
+    received = 0
+    with os.fdopen(fd, 'wb') as chunk:
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            digest.update(data)
+            chunk.write(data)
+            received += len(data)
+    if received != length or digest.hexdigest() != checksum:
+        _remove(chunk_path)
+        raise ValidationError("The chunk was incomplete or did not match Upload-Checksum; send it again.")
+
+    try:
+        _append(upload, offset, length, chunk_path)
+    finally:
+        _remove(chunk_path)
+
+    upload.offset = offset + length
+    if upload.offset == upload.size:
+        return complete(upload)
+    return None
+
+
+def _append(upload, offset, length, chunk_path):
+    """
+    Copy a verified chunk onto the part file and only then move the offset,
+    under an exclusive lock on the part file, so concurrent requests for the
+    same upload take turns and the offset never runs ahead of the bytes on disk.
+    """
+    with open(part_path(upload), 'ab') as part:
+        locks.lock(part, locks.LOCK_EX)
+        try:
+            # A concurrent request for the same range may have got in first.
+            if not ImageUpload.objects.filter(pk=upload.pk, offset=offset).exists():
+                raise UploadConflict()
+            # Drop anything a crashed request wrote past the offset.
+            part.truncate(offset)
+            with open(chunk_path, 'rb') as chunk:
+                while data := chunk.read(READ_SIZE):
+                    part.write(data)
+            part.flush()
+            os.fsync(part.fileno())
+            ImageUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=offset + length)
+        finally:
+            locks.unlock(part)
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while data := f.read(READ_SIZE):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def complete(upload):
+    """Verify and validate the assembled file and attach it to a new ``ProductImage``."""
+    path = part_path(upload)
+    if upload.checksum and _file_checksum(path) != upload.checksum:
+        discard(upload)
+        raise ValidationError("The uploaded file does not match its checksum; start the upload again.")
+    try:
+        with Image.open(path) as picture:
+            picture.verify()
+    except Exception:
+        discard(upload)
+        raise ValidationError({'image': "Upload a valid image. The file you uploaded was either not an image or a corrupted image."})
+
+    with open(path, 'rb') as f, transaction.atomic():
+        image = ProductImage(product_id=upload.product_id, **image_metadata(File(f)))
+        image.image.save(os.path.basename(upload.filename), File(f), save=False)
+        image.save()
+        enqueue('products.generate_thumbnail', {'image_id': image.pk}, dedupe_key=f'thumbnail:{image.pk}')
+    discard(upload)
+    return image
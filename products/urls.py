@@ -1,15 +1,25 @@
 from django.urls import path, include
 from .views import (
     ProductListCreateView,
+    ProductBatchView,
+    ProductSuggestView,
+    ProductSimilarView,
     ProductDetailView,
     ProductImageUploadView,
     ProductImageDetailView,
+    ImageUploadCreateView,
+    ImageUploadDetailView,
 )
 
 urlpatterns = [
     path('', ProductListCreateView.as_view(), name='product-list-create'),
+    path('batch/', ProductBatchView.as_view(), name='product-batch'),
+    path('suggest/', ProductSuggestView.as_view(), name='product-suggest'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    path('<int:pk>/similar/', ProductSimilarView.as_view(), name='product-similar'),
     path('<int:product_id>/upload-image/', ProductImageUploadView.as_view(), name='product-image-upload'),
     path('<int:product_id>/reviews/', include('reviews.urls')),
+    path('<int:product_id>/uploads/', ImageUploadCreateView.as_view(), name='image-upload-create'),
+    path('uploads/<uuid:pk>/', ImageUploadDetailView.as_view(), name='image-upload-detail'),
     path('images/<int:pk>/', ProductImageDetailView.as_view(), name='product-image-detail'),
 ]
\ No newline at end of file
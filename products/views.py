@@ -1,41 +1,212 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
 from rest_framework import generics, permissions, status
-from rest_framework.exceptions import NotFound
-from .models import Product , ProductImage
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from core.caching import CachedResponseMixin
+from core.fastpath import FastListMixin, detail_url_builder, media_url_builder
+from core.idempotency import IdempotentCreateMixin
+from core.jobs import enqueue
+from .models import ImageUpload, Product , ProductImage, SimilarProduct
 from .serializers import (
+    ImageUploadSerializer,
     ProductListSerializer,
     ProductDetailSerializer,
     ProductImageUploadSerializer,
-    ProductImageSerializer 
+    ProductImageSerializer,
+    SimilarProductSerializer,
 )
+from .imaging import image_metadata
 from .permissions import IsAdminOrReadOnly
+from .suggest import suggest_index
+from .uploads import discard, expire_uploads, parse_checksum, receive_chunk
 
-class ProductListCreateView(generics.ListCreateAPIView):
-    queryset = Product.objects.all().order_by('name')
+class ProductListCreateView(IdempotentCreateMixin, CachedResponseMixin, FastListMixin, generics.ListCreateAPIView):
+    queryset = Product.objects.visible().order_by('name')
     serializer_class = ProductListSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_scopes = ['products']
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
+    def fast_list_rows(self, queryset):
+        images = defaultdict(list)
+        image_url = media_url_builder(self.request, ProductImage._meta.get_field('image').storage)
+        for product_id, image_id, name, thumbnail, width, height, image_format, size, placeholder in (
+            ProductImage.objects.filter(product__in=queryset.values('pk')).order_by('id')
+            .values_list('product_id', 'id', 'image', 'thumbnail', 'width', 'height', 'format', 'size', 'placeholder')
+        ):
+            images[product_id].append({
+                'id': image_id,
+                'image': image_url(name),
+                'thumbnail': image_url(thumbnail),
+                'width': width,
+                'height': height,
+                'format': image_format,
+                'size': size,
+                'placeholder': placeholder,
+            })
+
+        product_url = detail_url_builder(self.request, 'product-detail')
+        price = self.get_serializer().fields['price'].to_representation
+        return [
+            {
+                'id': pk,
+                'url': product_url(pk),
+                'name': name,
+                'price': price(product_price),
+                'average_rating': rating_sum / review_count if review_count else 0.0,
+                'images': images[pk],
+            }
+            for pk, name, product_price, review_count, rating_sum in queryset.values_list(
+                'id', 'name', 'price', 'review_count', 'rating_sum'
+            )
+        ]
+
+class ProductDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Product.objects.visible()
     serializer_class = ProductDetailSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_scopes = ['product:{pk}']
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+class ProductBatchView(generics.GenericAPIView):
+    """
+    Return several products by id (``?ids=3,1,7``) in the requested order,
+    with images and stored aggregates, in two queries. Ids that do not exist
+    are listed under ``missing``.
+    """
+    queryset = Product.objects.visible().prefetch_related('images')
+    serializer_class = ProductListSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get_ids(self):
+        raw = [part.strip() for part in self.request.query_params.get('ids', '').split(',') if part.strip()]
+        if not raw:
+            raise ValidationError({'ids': "Provide a comma-separated list of product IDs."})
+        try:
+            ids = list(dict.fromkeys(int(part) for part in raw))
+        except ValueError:
+            raise ValidationError({'ids': "Product IDs must be integers."})
+        if len(ids) > settings.PRODUCT_BATCH_MAX_IDS:
+            raise ValidationError({'ids': f"At most {settings.PRODUCT_BATCH_MAX_IDS} IDs may be requested at once."})
+        return ids
+
+    def get(self, request, *args, **kwargs):
+        ids = self.get_ids()
+        products = self.get_queryset().in_bulk(ids)
+        found = [products[pk] for pk in ids if pk in products]
+        return Response({
+            'results': self.get_serializer(found, many=True).data,
+            'missing': [pk for pk in ids if pk not in products],
+        })
+
+class ProductSuggestView(generics.GenericAPIView):
+    """
+    Name completions for a search box (``?prefix=mech&limit=5``), most
+    reviewed first, answered from the in-memory index in products/suggest.py.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request, *args, **kwargs):
+        prefix = request.query_params.get('prefix', '').strip()
+        if not prefix:
+            raise ValidationError({'prefix': "This parameter is required."})
+        try:
+            limit = min(int(request.query_params.get('limit', settings.PRODUCT_SUGGEST_LIMIT)), settings.PRODUCT_SUGGEST_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': "A valid integer is required."})
+        return Response([{'id': pk, 'name': name} for pk, name in suggest_index.suggest(prefix, max(limit, 1))])
+
+class ProductSimilarView(generics.ListAPIView):
+    """
+    "Customers who reviewed this also liked": neighbours precomputed by
+    ``manage.py compute_similar_products``, read with one indexed query.
+    """
+    serializer_class = SimilarProductSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get_queryset(self):
+        return (
+            SimilarProduct.objects.filter(product_id=self.kwargs['pk'], similar__deleted_at__isnull=True)
+            .select_related('similar').order_by('rank')
+        )
 
-class ProductImageUploadView(generics.CreateAPIView):
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Only pay for an existence check when there is nothing to show.
+        if not response.data and not Product.objects.visible().filter(pk=self.kwargs['pk']).exists():
+            raise NotFound("A product with this ID does not exist.")
+        return response
+
+class ProductImageUploadView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = ProductImageUploadSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    @transaction.atomic
     def perform_create(self, serializer):
         product_id = self.kwargs.get('product_id')
         try:
-            product = Product.objects.get(pk=product_id)
+            product = Product.objects.visible().get(pk=product_id)
+        except Product.DoesNotExist:
+            raise NotFound("A product with this ID does not exist.")
+        image = serializer.save(product=product, **image_metadata(serializer.validated_data['image']))
+        enqueue('products.generate_thumbnail', {'image_id': image.pk}, dedupe_key=f'thumbnail:{image.pk}')
+
+class ImageUploadCreateView(generics.CreateAPIView):
+    """Start a resumable, chunked image upload for a product (see products/uploads.py)."""
+    serializer_class = ImageUploadSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def perform_create(self, serializer):
+        try:
+            product = Product.objects.visible().get(pk=self.kwargs['product_id'])
         except Product.DoesNotExist:
             raise NotFound("A product with this ID does not exist.")
-        serializer.save(product=product)
+        expire_uploads()
+        serializer.save(product=product, created_by=self.request.user)
+
+class ImageUploadDetailView(generics.RetrieveDestroyAPIView):
+    """
+    GET the offset to resume from, PATCH the next chunk as the raw request
+    body, or DELETE to abandon the upload.
+    """
+    queryset = ImageUpload.objects.all()
+    serializer_class = ImageUploadSerializer
+    permission_classes = [permissions.IsAdminUser]
+    # The chunk is read straight from the request stream, never parsed.
+    parser_classes = []
+
+    def patch(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            raise ValidationError("Upload-Offset and Content-Length headers are required.")
+        checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+
+        image = receive_chunk(upload, request._request, offset, length, checksum)
+        if image is not None:
+            return Response(ProductImageSerializer(image, context=self.get_serializer_context()).data,
+                            status=status.HTTP_201_CREATED)
+        return Response(self.get_serializer(upload).data)
+
+    def perform_destroy(self, instance):
+        discard(instance)
 
 class ProductImageDetailView(generics.RetrieveDestroyAPIView):
     """
     View for an admin to retrieve or delete a specific product image.
     This is the new view we added.
     """
-    queryset = ProductImage.objects.all()
+    queryset = ProductImage.objects.filter(product__deleted_at__isnull=True)
     serializer_class = ProductImageSerializer
     permission_classes = [permissions.IsAdminUser]
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        names = [name for name in (instance.image.name, instance.thumbnail.name) if name]
+        instance.delete()
+        enqueue('products.delete_files', {'names': names})
@@ -1,3 +1,31 @@
 from django.contrib import admin
+from core.admin import LargeTableAdmin
+from .models import ArchivedReview, Review
 
-# Register your models here.
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ['id', 'product', 'user', 'rating', 'created_at']
+    list_select_related = ['product', 'user']
+    raw_id_fields = ['product', 'user']
+    # Exact matches on indexed columns only; a substring search would scan every review.
+    search_fields = ['=product__id', '=user__username']
+    list_filter = ['rating']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['-id']
+
+
+@admin.register(ArchivedReview)
+class ArchivedReviewAdmin(LargeTableAdmin):
+    list_display = ['id', 'product', 'user', 'rating', 'created_at']
+    list_select_related = ['product', 'user']
+    search_fields = ['=product__id', '=user__username']
+    fields = ['id', 'product', 'user', 'rating', 'feedback', 'created_at', 'updated_at']
+    readonly_fields = fields
+    ordering = ['-id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,58 @@
+"""
+Tiered review storage.
+
+``archive_reviews()`` moves reviews older than a cutoff from ``Review`` into
+``ArchivedReview`` a batch at a time, so the hot table (and its indexes) only
+holds recent reviews. Every archived review is older than every hot one, so a
+newest-first listing reads the hot table first and only continues into the
+archive once it runs out (see ``TieredCursorPagination``).
+
+Moving a review is not a change to it: it stays in the changes feed and the
+stored product aggregates are unaffected. Archived reviews leave the keyword
+index, so facets describe the reviews still in the hot table.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from core.caching import bump_versions
+from .models import ArchivedReview, Review, ReviewKeyword
+from .tasks import recount_facets
+
+_state = threading.local()
+
+
+@contextmanager
+def moving():
+    """Mark reviews deleted in this block as archived rather than deleted."""
+    _state.moving = True
+    try:
+        yield
+    finally:
+        _state.moving = False
+
+
+def is_moving():
+    return getattr(_state, 'moving', False)
+
+
+def archive_reviews(before, batch_size):
+    """Move reviews created before ``before`` into the archive. Returns how many were moved."""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(Review.objects.filter(created_at__lt=before).order_by('created_at', 'id')[:batch_size])
+            if not batch:
+                return moved
+            ids = [review.pk for review in batch]
+            ArchivedReview.objects.bulk_create([ArchivedReview.from_review(review) for review in batch])
+            postings = ReviewKeyword.objects.filter(review_id__in=ids)
+            product_ids = {review.product_id for review in batch}
+            terms = set(postings.values_list('term', flat=True))
+            postings.delete()
+            with moving():
+                Review.objects.filter(pk__in=ids).delete()
+            if terms:
+                recount_facets(product_ids, terms)
+        bump_versions('products', *(f'product:{product_id}' for product_id in product_ids))
+        moved += len(batch)
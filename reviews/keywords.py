@@ -0,0 +1,47 @@
+"""
+Keyword and phrase extraction for review facets.
+
+Feedback is lower-cased and split into words; common English stop words,
+numbers and very short words are dropped. The remaining words and every
+pair of adjacent remaining words ("battery life") are the review's terms.
+"""
+import re
+
+WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+MIN_WORD_LENGTH = 3
+MAX_TERM_LENGTH = 64
+MAX_TERMS_PER_REVIEW = 50
+
+STOP_WORDS = frozenset("""
+    about above after again against all also and any are aren't because been before being below between both
+    but can can't cannot could couldn't did didn't does doesn't doing don't down during each even ever every
+    few for from further get gets got had hadn't has hasn't have haven't having her here hers herself him
+    himself his how i'd i'll i'm i've into isn't it's its itself just let's like more most much must mustn't
+    myself nor not now off once one only other ought our ours ourselves out over own really same she she'd
+    she'll she's should shouldn't so some still such than that that's the their theirs them themselves then
+    there there's these they they'd they'll they're they've thing things this those through too under until
+    very was wasn't way we'd we'll we're we've well were weren't what what's when when's where where's which
+    while who who's whom why why's will with won't would wouldn't yes yet you you'd you'll you're you've your
+    yours yourself yourselves
+""".split())
+
+
+def normalize_term(term):
+    return ' '.join(term.split()).casefold()
+
+
+def extract_terms(text):
+    """Return the set of facet terms (words and two-word phrases) in ``text``."""
+    terms = []
+    previous = None
+    for match in WORD_RE.finditer(text.casefold()):
+        word = match.group()
+        if len(word) < MIN_WORD_LENGTH or word in STOP_WORDS:
+            previous = None
+            continue
+        terms.append(word)
+        if previous is not None:
+            terms.append(f'{previous} {word}')
+        previous = word
+    unique = dict.fromkeys(term for term in terms if len(term) <= MAX_TERM_LENGTH)
+    return set(list(unique)[:MAX_TERMS_PER_REVIEW])
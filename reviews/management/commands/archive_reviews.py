@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from reviews.archive import archive_reviews
+
+
+class Command(BaseCommand):
+    help = (
+        "Move old reviews from the reviews table into the compressed archive. "
+        "Safe to run at any time, e.g. nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.REVIEW_ARCHIVE_AFTER_DAYS,
+                            help='Archive reviews older than this many days.')
+        parser.add_argument('--batch-size', type=int, default=settings.REVIEW_ARCHIVE_BATCH_SIZE,
+                            help='Reviews moved per transaction.')
+
+    def handle(self, *args, **options):
+        moved = archive_reviews(timezone.now() - timedelta(days=options['days']), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} reviews."))
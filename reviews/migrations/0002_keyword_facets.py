@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:54
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+from reviews.keywords import extract_terms
+
+
+def backfill_keyword_index(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ReviewKeyword = apps.get_model('reviews', 'ReviewKeyword')
+    ProductFacet = apps.get_model('reviews', 'ProductFacet')
+    counts = Counter()
+    postings = []
+    for review_id, product_id, feedback in Review.objects.values_list('id', 'product_id', 'feedback').iterator():
+        for term in extract_terms(feedback):
+            postings.append(ReviewKeyword(review_id=review_id, product_id=product_id, term=term))
+            counts[product_id, term] += 1
+        if len(postings) >= 5000:
+            ReviewKeyword.objects.bulk_create(postings)
+            postings = []
+    ReviewKeyword.objects.bulk_create(postings)
+    ProductFacet.objects.bulk_create(
+        (ProductFacet(product_id=product_id, term=term, count=n) for (product_id, term), n in counts.items()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_similar_product'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-count'], name='reviews_facet_prod_count_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'term'), name='reviews_facet_product_term_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='reviews.review')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'term'], name='reviews_kw_product_term_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_keyword_index, migrations.RunPython.noop),
+    ]
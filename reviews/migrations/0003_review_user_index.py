@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_image_upload'),
+        ('reviews', '0002_keyword_facets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='reviews_user_created_idx'),
+        ),
+    ]
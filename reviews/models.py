@@ -1,3 +1,5 @@
+import zlib
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -11,9 +13,83 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-class Meta:
-    unique_together = ('product', 'user')
-    ordering = ['-created_at']
+    class Meta:
+        indexes = [
+            # A user's review history, newest first (keyset pagination).
+            models.Index(fields=['user', '-created_at', '-id'], name='reviews_user_created_idx'),
+            # Oldest first, for archive_reviews.
+            models.Index(fields=['created_at', 'id'], name='reviews_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Review by {self.user.username} for {self.product.name}"
+
+
+class ArchivedReview(models.Model):
+    """
+    A review moved out of ``Review`` by the ``archive_reviews`` command once it
+    is older than ``REVIEW_ARCHIVE_AFTER_DAYS``. It keeps its id; the feedback
+    text is stored zlib-compressed.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, related_name='archived_reviews', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='archived_reviews', on_delete=models.CASCADE)
+    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    feedback_compressed = models.BinaryField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-created_at', '-id'], name='reviews_arch_product_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='reviews_arch_user_idx'),
+        ]
+
+    @classmethod
+    def from_review(cls, review):
+        return cls(
+            id=review.pk, product_id=review.product_id, user_id=review.user_id, rating=review.rating,
+            feedback_compressed=zlib.compress(review.feedback.encode(), 9),
+            created_at=review.created_at, updated_at=review.updated_at,
+        )
+
+    @property
+    def feedback(self):
+        return zlib.decompress(self.feedback_compressed).decode()
+
+    def __str__(self):
+        return f"Archived review {self.pk} for product {self.product_id}"
+
+
+class ReviewKeyword(models.Model):
+    """Inverted index of review feedback: one row per (review, term)."""
+    review = models.ForeignKey(Review, related_name='keywords', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='+', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'term'], name='reviews_kw_product_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in review {self.review_id}"
+
+
+class ProductFacet(models.Model):
+    """Number of reviews of a product that mention a term, kept up to date by 'reviews.index_keywords'."""
+    product = models.ForeignKey(Product, related_name='facets', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'term'], name='reviews_facet_product_term_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-count'], name='reviews_facet_prod_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.count})"
 
-def __str__(self):
-    return f"Review by {self.user.username} for {self.product.name}"
\ No newline at end of file
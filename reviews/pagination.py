@@ -0,0 +1,84 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import ArchivedReview
+
+
+class TieredCursorPagination(BasePagination):
+    """
+    Newest-first keyset pagination over ``(hot, archived)`` review querysets.
+
+    Every archived review is older than every hot one, so a page is read from
+    the hot table and only continues into the archive when the hot rows run
+    out. The cursor holds the ``(created_at, id)`` of the last review sent and
+    whether it was archived, so later pages go straight to the right table and
+    reviews archived between requests are neither skipped nor repeated.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tier, created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return tier == 'archive', datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, review):
+        tier = 'archive' if isinstance(review, ArchivedReview) else 'hot'
+        raw = f'{tier}|{review.created_at.isoformat()}|{review.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        # One extra row tells whether there is a next page.
+        wanted = page_size + 1
+        rows = []
+        for queryset in querysets[1:] if cursor and cursor[0] else querysets:
+            queryset = queryset.order_by('-created_at', '-id')
+            if cursor:
+                _, created_at, pk = cursor
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            rows += queryset[:wanted - len(rows)]
+            if len(rows) == wanted:
+                break
+        self.next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
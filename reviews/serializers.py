@@ -6,4 +6,29 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = ['id', 'user', 'rating', 'feedback', 'created_at']
\ No newline at end of file
+        fields = ['id', 'user', 'rating', 'feedback', 'created_at']
+
+class UserReviewSerializer(serializers.ModelSerializer):
+    """A review as shown in its author's history, with the product it is about."""
+    product_name = serializers.ReadOnlyField(source='product.name')
+    product_thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Review
+        fields = ['id', 'product', 'product_name', 'product_thumbnail', 'rating', 'feedback', 'created_at']
+
+    def get_product_thumbnail(self, obj):
+        # Expects product images to be prefetched.
+        for image in obj.product.images.all():
+            file = image.thumbnail or image.image
+            request = self.context.get('request')
+            return request.build_absolute_uri(file.url) if request else file.url
+        return None
+
+
+class ReviewChangeSerializer(serializers.ModelSerializer):
+    user = serializers.ReadOnlyField(source='user.username')
+
+    class Meta:
+        model = Review
+        fields = ['id', 'product', 'user', 'rating', 'feedback', 'created_at', 'updated_at']
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import changes
+from core.caching import bump_versions
+from core.models import ChangeLogEntry
+from .archive import is_moving
+from .models import ArchivedReview, Review
+from .serializers import ReviewChangeSerializer
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_responses(sender, instance, **kwargs):
+    if is_moving():
+        # archive_reviews() bumps once per batch.
+        return
+    # The product list shows average ratings, so it depends on reviews too.
+    bump_versions('products', f'product:{instance.product_id}')
+
+
+def _fetch_reviews(ids):
+    # A review archived since it was logged is still there.
+    return [
+        *Review.objects.filter(pk__in=ids, product__deleted_at__isnull=True).select_related('user'),
+        *ArchivedReview.objects.filter(pk__in=ids, product__deleted_at__isnull=True).select_related('user'),
+    ]
+
+
+changes.register('review', _fetch_reviews, ReviewChangeSerializer)
+
+
+@receiver(post_save, sender=Review)
+def log_review_change(sender, instance, **kwargs):
+    changes.record('review', instance.pk)
+
+
+@receiver(post_delete, sender=Review)
+def log_review_delete(sender, instance, **kwargs):
+    if is_moving():
+        # Still there, just in the archive.
+        return
+    changes.record('review', instance.pk, ChangeLogEntry.DELETE)
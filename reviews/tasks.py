@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models import Count
+from core.caching import bump_versions
+from core.jobs import job
+from .keywords import extract_terms
+from .models import ProductFacet, Review, ReviewKeyword
+
+
+@job('reviews.index_keywords', batch_size=100)
+def index_keywords(payloads):
+    """
+    Add reviews to the keyword index and recount the facets they touch.
+    Safe to run twice for the same review.
+    """
+    reviews = Review.objects.filter(pk__in={payload['review_id'] for payload in payloads}).only('product_id', 'feedback')
+    postings = [
+        ReviewKeyword(review_id=review.pk, product_id=review.product_id, term=term)
+        for review in reviews for term in extract_terms(review.feedback)
+    ]
+    if not postings:
+        return
+    product_ids = {posting.product_id for posting in postings}
+    with transaction.atomic():
+        ReviewKeyword.objects.filter(review_id__in={posting.review_id for posting in postings}).delete()
+        ReviewKeyword.objects.bulk_create(postings, batch_size=500)
+        recount_facets(product_ids, {posting.term for posting in postings})
+    bump_versions(*(f'product:{product_id}' for product_id in product_ids))
+
+
+def recount_facets(product_ids, terms):
+    """Recount the ``terms`` facets of ``product_ids`` from the keyword index."""
+    counts = (
+        ReviewKeyword.objects.filter(product_id__in=product_ids, term__in=terms)
+        .values_list('product_id', 'term').annotate(n=Count('id'))
+    )
+    facets = [ProductFacet(product_id=product_id, term=term, count=n) for product_id, term, n in counts]
+    ProductFacet.objects.filter(product_id__in=product_ids, term__in=terms).delete()
+    ProductFacet.objects.bulk_create(facets, batch_size=500)
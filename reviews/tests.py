@@ -1,12 +1,28 @@
 # reviews/tests.py
 
+import asyncio
+import json
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
+from core.changes import read_changes
+from core.events import get_backend
+from core.jobs import run_pending_jobs
 from products.models import Product
-from .models import Review
+from .archive import archive_reviews
+from .keywords import extract_terms
+from .models import ArchivedReview, ProductFacet, Review, ReviewKeyword
+from .tasks import index_keywords
 
 class ReviewTests(APITestCase):
     """
@@ -96,7 +112,9 @@ class ReviewTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user_token.key)
         review_url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
         self.client.post(review_url, {'rating': 5, 'feedback': 'Excellent!'}, format='json')
-        
+        # Aggregates are recomputed by a background job.
+        run_pending_jobs()
+
         self.product.refresh_from_db()
         self.assertEqual(self.product.average_rating, 5.0)
 
@@ -104,7 +122,226 @@ class ReviewTests(APITestCase):
         another_user_token = Token.objects.create(user=self.another_user)
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + another_user_token.key)
         self.client.post(review_url, {'rating': 3, 'feedback': 'It was okay.'}, format='json')
-        
+        run_pending_jobs()
+
         self.assertEqual(self.product.reviews.count(), 2)
         self.product.refresh_from_db()
-        self.assertEqual(self.product.average_rating, 4.0)
\ No newline at end of file
+        self.assertEqual(self.product.average_rating, 4.0)
+
+    # --- Fast-path List Rendering Test ---
+
+    def test_fast_review_list_matches_serializer_output(self):
+        """
+        Ensure the fast-path review list, archived reviews included, is byte-identical to the serializer output.
+        """
+        Review.objects.create(product=self.product, user=self.another_user, rating=2, feedback='Meh.')
+        archive_reviews(timezone.now(), batch_size=10)
+        Review.objects.create(product=self.product, user=self.regular_user, rating=5, feedback='Crème de la crème "quoted"\n')
+        url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+
+        with self.settings(FAST_LIST_RENDERING=False, RESPONSE_CACHE_ENABLED=False):
+            slow_response = self.client.get(url)
+        # Hot reviews, archived reviews and usernames.
+        with self.settings(RESPONSE_CACHE_ENABLED=False), self.assertNumQueries(3):
+            fast_response = self.client.get(url)
+
+        self.assertEqual(fast_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast_response.content, slow_response.content)
+
+    # --- Idempotency Tests ---
+
+    def test_retried_review_with_idempotency_key_is_replayed(self):
+        """
+        Ensure a retry with the same Idempotency-Key gets the original 201, not a duplicate error.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user_token.key)
+        url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+        data = {'rating': 5, 'feedback': 'Sent twice on a bad connection.'}
+        first = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='review-1')
+        retry = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='review-1')
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Review.objects.count(), 1)
+
+        other = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='review-2')
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # --- Keyword Facet Tests ---
+
+    def test_review_keywords_become_facets_and_filters(self):
+        """
+        Ensure new reviews are indexed in the background and can be filtered by facet.
+        """
+        url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+        for user, feedback in [
+            (self.regular_user, 'Great battery life, but the fan noise is loud.'),
+            (self.another_user, 'The BATTERY died quickly.'),
+        ]:
+            self.client.force_authenticate(user)
+            self.client.post(url, {'rating': 3, 'feedback': feedback}, format='json')
+        self.client.force_authenticate(None)
+        self.assertEqual(ReviewKeyword.objects.count(), 0)
+
+        run_pending_jobs()
+        # Indexing a review twice (e.g. a retried job) must not double its counts.
+        index_keywords([{'review_id': review.pk} for review in Review.objects.all()])
+        detail = self.client.get(reverse('product-detail', kwargs={'pk': self.product.pk}))
+        facets = {facet['term']: facet['count'] for facet in json.loads(detail.content)['facets']}
+        self.assertEqual(facets['battery'], 2)
+        self.assertEqual(facets['battery life'], 1)
+        self.assertNotIn('the', facets)
+
+        with self.settings(RESPONSE_CACHE_ENABLED=False):
+            response = self.client.get(url, {'facet': 'Battery  Life'})
+        self.assertEqual([review['user'] for review in json.loads(response.content)], ['user'])
+
+    def test_extract_terms_skips_stop_words_and_short_words(self):
+        """
+        Ensure phrases are only built from adjacent meaningful words.
+        """
+        self.assertEqual(extract_terms("It's a quiet fan, and 10/10 for noise cancelling!"),
+                         {'quiet', 'fan', 'quiet fan', 'noise', 'cancelling', 'noise cancelling'})
+
+    # --- Review Archive Tests ---
+
+    def make_reviews(self, count, days_ago=0):
+        reviews = []
+        for i in range(count):
+            user = User.objects.create_user(username=f'reviewer{days_ago}-{i}')
+            reviews.append(Review.objects.create(product=self.product, user=user, rating=i % 5 + 1, feedback=f'Review {i}'))
+        Review.objects.filter(pk__in=[review.pk for review in reviews]).update(
+            created_at=timezone.now() - timedelta(days=days_ago))
+        return reviews
+
+    def test_archive_moves_old_reviews_and_keeps_them_visible(self):
+        """
+        Ensure archived reviews leave the hot table but still count, list and block duplicates.
+        """
+        old = self.make_reviews(3, days_ago=400)
+        self.make_reviews(2)
+        _, cursor, _ = read_changes(0, 100)
+        out = StringIO()
+        call_command('archive_reviews', '--batch-size', '2', stdout=out)
+
+        self.assertIn('Archived 3 reviews', out.getvalue())
+        self.assertEqual(Review.objects.count(), 2)
+        archived = ArchivedReview.objects.get(pk=old[0].pk)
+        self.assertEqual(archived.feedback, 'Review 0')
+        self.assertEqual(read_changes(cursor, 100)[0], [])
+
+        from products.tasks import refresh_aggregates
+        refresh_aggregates([{'product_id': self.product.pk}])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.review_count, self.product.rating_sum), (5, 1 + 2 + 3 + 1 + 2))
+
+        url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+        self.assertEqual(len(json.loads(self.client.get(url).content)), 5)
+        detail = self.client.get(reverse('product-detail', kwargs={'pk': self.product.pk})).data
+        self.assertEqual([review['id'] for review in detail['reviews']][:3], [review.pk for review in old])
+        self.assertEqual(len(detail['reviews']), 5)
+        self.client.force_authenticate(old[0].user)
+        response = self.client.post(url, {'rating': 5, 'feedback': 'Again!'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paged_list_reads_archive_only_past_hot_reviews(self):
+        """
+        Ensure paging goes through hot reviews first and then continues into the archive.
+        """
+        old = self.make_reviews(3, days_ago=400)
+        hot = self.make_reviews(3)
+        archive_reviews(timezone.now() - timedelta(days=365), batch_size=10)
+        url = reverse('review-list-create', kwargs={'product_id': self.product.pk})
+
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(url, {'page_size': 2}).data
+        self.assertFalse(any('reviews_archivedreview' in query['sql'] for query in queries.captured_queries))
+        ids = [review['id'] for review in first['results']]
+        next_url = first['next']
+        while next_url:
+            page = self.client.get(next_url).data
+            ids += [review['id'] for review in page['results']]
+            next_url = page['next']
+        expected = sorted(hot, key=lambda r: (r.created_at, r.pk), reverse=True) + sorted(
+            old, key=lambda r: (r.created_at, r.pk), reverse=True)
+        self.assertEqual(ids, [review.pk for review in expected])
+
+    def test_archive_keeps_duplicate_reviews(self):
+        """
+        Ensure a user's second review of a product, let in by a race, is archived too.
+        """
+        first, = self.make_reviews(1, days_ago=400)
+        second = Review.objects.create(product=self.product, user=first.user, rating=1, feedback='Again.')
+        Review.objects.filter(pk=second.pk).update(created_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(archive_reviews(timezone.now() - timedelta(days=365), batch_size=10), 2)
+        self.assertEqual(ArchivedReview.objects.filter(user=first.user).count(), 2)
+
+    def test_archive_recounts_facets(self):
+        """
+        Ensure archived reviews leave the keyword index and its facet counts.
+        """
+        old, = self.make_reviews(1, days_ago=400)
+        recent, = self.make_reviews(1)
+        Review.objects.filter(pk=old.pk).update(feedback='Loud fan.')
+        Review.objects.filter(pk=recent.pk).update(feedback='Quiet fan.')
+        index_keywords([{'review_id': old.pk}, {'review_id': recent.pk}])
+        self.assertEqual(ProductFacet.objects.get(product=self.product, term='fan').count, 2)
+
+        archive_reviews(timezone.now() - timedelta(days=365), batch_size=10)
+        self.assertEqual(ProductFacet.objects.get(product=self.product, term='fan').count, 1)
+        self.assertFalse(ProductFacet.objects.filter(term='loud').exists())
+
+    # --- Admin Tests ---
+
+    def test_review_admin_changelist_runs_constant_queries(self):
+        """
+        Ensure the review changelist does not issue queries per row.
+        """
+        admin_user = User.objects.create_superuser(username='admin', password='password123', email='admin@example.com')
+        self.client.force_login(admin_user)
+        url = reverse('admin:reviews_review_changelist')
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        Review.objects.create(product=self.product, user=self.regular_user, rating=5, feedback='Great.')
+        few = changelist_queries()
+        for i in range(10):
+            product = Product.objects.create(name=f'Monitor {i}', description='A monitor.', price='99.00')
+            Review.objects.create(product=product, user=self.another_user, rating=3, feedback='Okay.')
+        self.assertEqual(changelist_queries(), few)
+
+    # --- Live Review Stream Tests ---
+
+    async def test_review_stream_resumes_from_last_event_id(self):
+        """
+        Ensure the SSE stream replays events after Last-Event-ID.
+        """
+        topic = f'product:{self.product.pk}'
+        publish = sync_to_async(get_backend().publish)
+        first_id = await publish(topic, 'review', {'feedback': 'first'})
+        await publish(topic, 'review', {'feedback': 'second'})
+
+        url = reverse('review-stream', kwargs={'product_id': self.product.pk})
+        response = await self.async_client.get(url, headers={'Last-Event-ID': str(first_id)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        chunk = (await asyncio.wait_for(anext(stream), 2)).decode()
+        self.assertIn(f'id: {first_id + 1}\n', chunk)
+        self.assertIn('event: review\n', chunk)
+        self.assertIn('"feedback": "second"', chunk)
+        await stream.aclose()
+
+    async def test_review_stream_for_missing_product(self):
+        """
+        Ensure streaming a non-existent product returns 404.
+        """
+        response = await self.async_client.get(reverse('review-stream', kwargs={'product_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
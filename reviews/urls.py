@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import ReviewListCreateView
+from .views import ReviewListCreateView, review_stream
 
 urlpatterns = [
     path('', ReviewListCreateView.as_view(), name='review-list-create'),
+    path('stream/', review_stream, name='review-stream'),
 ]
\ No newline at end of file
@@ -1,25 +1,175 @@
+import zlib
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+from django.views.decorators.http import require_GET
 from rest_framework import generics, permissions
 from rest_framework.exceptions import ValidationError, NotFound
-from .models import Review
-from .serializers import ReviewSerializer
-from products.models import Product
+from rest_framework.response import Response
+from core.caching import CachedResponseMixin
+from core.events import publish, sse_stream
+from core.fastpath import FastListMixin
+from core.idempotency import IdempotentCreateMixin
+from core.jobs import enqueue
+from core.throttling import ReviewWriteRateThrottle
+from .keywords import normalize_term
+from .models import ArchivedReview, Review, ReviewKeyword
+from .pagination import TieredCursorPagination
+from .serializers import ReviewSerializer, UserReviewSerializer
+from products.models import Product, ProductImage
+
+
+class TieredListMixin:
+    """
+    List the hot reviews of ``get_queryset()`` followed by the archived ones of
+    ``get_archived_queryset()``. Paginated, the archive is only read once a
+    client pages past the hot reviews (see ``TieredCursorPagination``).
+    """
+
+    def get_archived_queryset(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        hot = self.filter_queryset(self.get_queryset())
+        archived = self.get_archived_queryset()
+        page = self.paginate_queryset((hot, archived))
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        # Unpaged, the list stays oldest first, the archive (all older) first.
+        archived = archived.order_by('created_at', 'id')
+        return Response(self.get_serializer([*archived, *hot], many=True).data)
+
 
-class ReviewListCreateView(generics.ListCreateAPIView):
+class ReviewListCreateView(IdempotentCreateMixin, CachedResponseMixin, FastListMixin, TieredListMixin, generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    throttle_classes = [ReviewWriteRateThrottle]
+    pagination_class = TieredCursorPagination
+    cache_scopes = ['product:{product_id}']
+
+    @property
+    def paginator(self):
+        # Paging is opt-in, so clients expecting the whole list still get it.
+        if not {'cursor', 'page_size'} & self.request.query_params.keys():
+            return None
+        return super().paginator
 
     def get_queryset(self):
         product_id = self.kwargs['product_id']
-        return Review.objects.filter(product_id=product_id)
+        queryset = Review.objects.filter(product_id=product_id, product__deleted_at__isnull=True)
+        facet = self.request.query_params.get('facet')
+        if facet:
+            # Answered from the keyword index, not by scanning feedback text.
+            matching = ReviewKeyword.objects.filter(product_id=product_id, term=normalize_term(facet))
+            queryset = queryset.filter(pk__in=matching.values('review_id'))
+        return queryset
+
+    def get_archived_queryset(self):
+        if self.request.query_params.get('facet'):
+            # Archived reviews are not in the keyword index.
+            return ArchivedReview.objects.none()
+        return ArchivedReview.objects.filter(
+            product_id=self.kwargs['product_id'], product__deleted_at__isnull=True,
+        ).select_related('user')
+
+    def fast_list_rows(self, queryset):
+        rows = [
+            (pk, user_id, rating, zlib.decompress(feedback).decode(), created)
+            for pk, user_id, rating, feedback, created in self.get_archived_queryset().order_by(
+                'created_at', 'id'
+            ).values_list('id', 'user_id', 'rating', 'feedback_compressed', 'created_at')
+        ]
+        rows += queryset.values_list('id', 'user_id', 'rating', 'feedback', 'created_at')
+        usernames = dict(User.objects.filter(pk__in={row[1] for row in rows}).values_list('id', 'username'))
+        created_at = self.get_serializer().fields['created_at'].to_representation
+        return [
+            {
+                'id': pk,
+                'user': usernames[user_id],
+                'rating': rating,
+                'feedback': feedback,
+                'created_at': created_at(created),
+            }
+            for pk, user_id, rating, feedback, created in rows
+        ]
 
+    @transaction.atomic
     def perform_create(self, serializer):
         product_id = self.kwargs.get('product_id')
         try:
-            product = Product.objects.get(pk=product_id)
+            product = Product.objects.visible().get(pk=product_id)
         except Product.DoesNotExist:
             raise NotFound("A product with this ID does not exist.")
 
-        if Review.objects.filter(product=product, user=self.request.user).exists():
+        if (
+            Review.objects.filter(product=product, user=self.request.user).exists()
+            or ArchivedReview.objects.filter(product=product, user=self.request.user).exists()
+        ):
             raise ValidationError("You have already submitted a review for this product.")
 
-        serializer.save(user=self.request.user, product=product)
\ No newline at end of file
+        serializer.save(user=self.request.user, product=product)
+        publish(f'product:{product.pk}', 'review', dict(serializer.data))
+        enqueue('products.refresh_aggregates', {'product_id': product.pk}, dedupe_key=f'product-aggregates:{product.pk}')
+        enqueue('reviews.index_keywords', {'review_id': serializer.instance.pk})
+
+
+class UserReviewHistoryView(TieredListMixin, generics.ListAPIView):
+    """
+    Every review a user has written, newest first, with the product's name and
+    thumbnail. ``get_user()`` picks whose reviews: see the subclasses.
+    """
+    serializer_class = UserReviewSerializer
+    pagination_class = TieredCursorPagination
+
+    def get_user(self):
+        return get_object_or_404(User, username=self.kwargs['username'])
+
+    @cached_property
+    def author(self):
+        return self.get_user()
+
+    def reviews_in(self, model):
+        return (
+            model.objects.filter(user=self.author, product__deleted_at__isnull=True)
+            .select_related('product')
+            .prefetch_related(Prefetch('product__images', queryset=ProductImage.objects.order_by('id')))
+        )
+
+    def get_queryset(self):
+        return self.reviews_in(Review)
+
+    def get_archived_queryset(self):
+        return self.reviews_in(ArchivedReview)
+
+
+class MyReviewHistoryView(UserReviewHistoryView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_user(self):
+        return self.request.user
+
+
+@require_GET
+async def review_stream(request, product_id):
+    """
+    Server-sent events for one product: a ``review`` event for each new review
+    and an ``aggregate`` event when its rating summary is recomputed.
+    Clients resume with the standard ``Last-Event-ID`` header.
+    Served best by an ASGI server (see product_review_system/asgi.py).
+    """
+    if not await Product.objects.visible().filter(pk=product_id).aexists():
+        raise Http404("A product with this ID does not exist.")
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(sse_stream(f'product:{product_id}', last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response